@@ -0,0 +1,131 @@
+import argparse
+import resource
+from time import perf_counter
+
+import torch
+from constants import *
+from gnn import RGCNModel, adjacency, batched_graph, best_sample, get_data, rollout
+from helpers import get_score, step_on_selected
+from inference import suggest_slots
+from torch_geometric.data import Data
+
+
+def synchronize(device: torch.device) -> None:
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def adjacency_bytes(data: Data) -> int:
+    tensors = [t for t in adjacency(data) if t is not None]
+    if "adj_t" in data:
+        adj_t = data.adj_t
+        tensors = [adj_t.crow_indices(), adj_t.col_indices(), adj_t.values()]
+    return sum(t.nbytes for t in tensors)
+
+
+def inference_slots_per_second(
+    model: RGCNModel, problem: Problem, data: Data, device: torch.device, n_slots: int
+) -> float:
+    model.eval()
+    suggest_slots(model, model.config, problem, n_slots, device, data)
+    synchronize(device)
+    start = perf_counter()
+    suggest_slots(model, model.config, problem, n_slots, device, data)
+    synchronize(device)
+    return n_slots / (perf_counter() - start)
+
+
+def training_slots_per_second(
+    model: RGCNModel,
+    problem: Problem,
+    data: Data,
+    device: torch.device,
+    n_slots: int,
+    n_samples: int,
+) -> float:
+    """One optimisation step over ``n_samples`` rollouts per slot."""
+    model.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    graph = batched_graph(data, n_samples)
+    old_selected = torch.zeros(problem.n_lessons, dtype=torch.bool, device=device)
+
+    start = None
+    embeddings = data.x
+    # The first slot warms up
+    for _ in range(n_slots + 1):
+        optimizer.zero_grad()
+        result = rollout(model, graph, embeddings)
+        selected = result > THRESHOLD
+        score, valid = get_score(problem, selected, embeddings)
+        loss = -(result * score).sum(1).mean()
+        loss.backward()
+        optimizer.step()
+
+        selected = selected[best_sample(score, valid)]
+        embeddings = step_on_selected(problem, embeddings, selected, old_selected)
+        if start is None:
+            synchronize(device)
+            start = perf_counter()
+    synchronize(device)
+    return n_slots / (perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Slots per second of GNN inference and training"
+    )
+    parser.add_argument("--device", help="Defaults to GNN_DEVICE, then CUDA or CPU")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="*",
+        default=[NUM_THREADS or torch.get_num_threads()],
+        help="Intra-op thread counts to compare",
+    )
+    parser.add_argument("--interop-threads", type=int, default=NUM_INTEROP_THREADS)
+    parser.add_argument("--slots", type=int, default=64)
+    parser.add_argument("--samples", type=int, default=ROLLOUT_SAMPLES)
+    parser.add_argument("--max-classes", type=int, default=MAX_CLASSES)
+    parser.add_argument(
+        "--sparse",
+        action="store_true",
+        default=SPARSE_ADJACENCY,
+        help="CSR adjacency with CSRRGCNConv instead of FastRGCNConv",
+    )
+    parser.add_argument("--head", default=MODEL_HEAD)
+    parser.add_argument("--readout", default=MODEL_READOUT)
+    args = parser.parse_args()
+
+    set_num_threads(num_interop_threads=args.interop_threads)
+    device = get_device(args.device)
+    problem = load_problem(max_classes=args.max_classes)
+    data = get_data(problem, sparse=args.sparse).to(device)
+    torch.manual_seed(0)
+    model = RGCNModel(
+        FEATURE_DIM,
+        10,
+        problem.n_lessons,
+        head=args.head,
+        readout=args.readout,
+        sparse=args.sparse,
+    ).to(device)
+
+    print(
+        f"{device}, {problem.n_lessons} lessons, "
+        f"{'CSR' if args.sparse else 'COO'} adjacency of "
+        f"{adjacency_bytes(data) / 2**10:.0f} KiB, head {args.head}, "
+        f"{args.samples} samples per training step"
+    )
+    for num_threads in args.threads:
+        torch.set_num_threads(num_threads)
+        inference = inference_slots_per_second(model, problem, data, device, args.slots)
+        training = training_slots_per_second(
+            model, problem, data, device, args.slots, args.samples
+        )
+        print(
+            f"{num_threads:>3} threads: inference {inference:8.1f} slots/s, "
+            f"training {training:8.1f} slots/s"
+        )
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    print(f"peak resident memory {peak:.0f} MiB")
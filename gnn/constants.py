@@ -1,19 +1,148 @@
+import os
+from collections.abc import Callable
+from functools import cache, cached_property
+from pathlib import Path
+
 import numpy as np
 import torch
 
 FEATURE_DIM = 7
 THRESHOLD = 0.5
-REQUIRED_LESSONS = torch.tensor(list(zip(*np.nonzero(np.load("data/constraints.npy")))))
-REQUIRED_LESSONS = REQUIRED_LESSONS[REQUIRED_LESSONS[:, 1] < 6]
-TEACHERS = REQUIRED_LESSONS[:, 0]
-CLASSES = REQUIRED_LESSONS[:, 1]
-SUBJECTS = REQUIRED_LESSONS[:, 2]
-CONSTRAINTS = torch.from_numpy(np.load("data/constraints.npy"))
-T, C, S = CONSTRAINTS.shape
-
-ARR_C, ARR_T = torch.arange(C), torch.arange(T)
-TEACHER_LESSONS_IDS = REQUIRED_LESSONS[:, 0] == ARR_T[:, None]
-CLASSES_LESSONS_IDS = REQUIRED_LESSONS[:, 0] == ARR_C[:, None]
+# Noisy forward passes scored together, and the budget of them per slot
+ROLLOUT_SAMPLES = 32
+MAX_ROLLOUT_SAMPLES = 1000
+NOISE_SCALE = 0.01
+LEARNING_RATE = 0.001
+# "node" scores lessons with a shared MLP, "dense" with the O(lessons²) layer
+MODEL_HEAD = "dense"
+MODEL_READOUT = "attention"
+# Per-relation CSR adjacency with CSRRGCNConv instead of COO with FastRGCNConv
+SPARSE_ADJACENCY = False
+DEFAULT_CONSTRAINTS_PATH = (
+    Path(__file__).resolve().parent.parent / "data/constraints.npy"
+)
+# Only the first classes of the school are scheduled for now
+MAX_CLASSES = 6
+CHECKPOINT_PATH = DEFAULT_CONSTRAINTS_PATH.parent / "checkpoints/rgcn.pt"
+# Empty uses CUDA when available, CPU otherwise; 0 threads keeps torch's default
+DEVICE = os.environ.get("GNN_DEVICE", "")
+NUM_THREADS = int(os.environ.get("GNN_NUM_THREADS", "0"))
+NUM_INTEROP_THREADS = int(os.environ.get("GNN_NUM_INTEROP_THREADS", "0"))
+
+
+class Problem:
+    """Lessons of one school, read from its (teachers, classes, subjects)
+    constraints file on first use.
+
+    The complementary and grouped subject rules are written for the indices
+    of the bundled constraints file, ``school_rules=False`` drops them for
+    other schools.
+    """
+
+    def __init__(
+        self,
+        constraints_path: str | Path | None,
+        max_classes: int = MAX_CLASSES,
+        school_rules: bool = True,
+    ):
+        self.constraints_path = constraints_path and Path(constraints_path)
+        self.max_classes = max_classes
+        self.global_complementary = GLOBAL_COMPLEMENTARY if school_rules else []
+        self.per_class_complementary = PER_CLASS_COMPLEMENTARY if school_rules else {}
+        self.group_subjects = GLOBAL_GROUP_SUBJECTS if school_rules else {}
+        self.device_cache = {}
+
+    @classmethod
+    def from_constraints(
+        cls,
+        constraints: np.ndarray | torch.Tensor,
+        max_classes: int = MAX_CLASSES,
+        school_rules: bool = False,
+    ) -> "Problem":
+        """Problem of an in-memory (teachers, classes, subjects) hours array."""
+        problem = cls(None, max_classes, school_rules)
+        problem.constraints = torch.as_tensor(constraints)
+        return problem
+
+    @cached_property
+    def constraints(self) -> torch.Tensor:
+        # Copy-on-write mapping, pages are only read when touched
+        return torch.from_numpy(np.load(self.constraints_path, mmap_mode="c"))
+
+    @cached_property
+    def required_lessons(self) -> torch.Tensor:
+        lessons = self.constraints.nonzero()
+        return lessons[lessons[:, 1] < self.max_classes]
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return tuple(self.constraints.shape)
+
+    @property
+    def n_lessons(self) -> int:
+        return self.required_lessons.shape[0]
+
+    @property
+    def teachers(self) -> torch.Tensor:
+        return self.required_lessons[:, 0]
+
+    @property
+    def classes(self) -> torch.Tensor:
+        return self.required_lessons[:, 1]
+
+    @property
+    def subjects(self) -> torch.Tensor:
+        return self.required_lessons[:, 2]
+
+    def on_device(self, name: str, device: torch.device | str, build: Callable):
+        """``build()``, computed once per problem and device."""
+        key = (name, torch.device(device))
+        if key not in self.device_cache:
+            self.device_cache[key] = build()
+        return self.device_cache[key]
+
+    def lesson_columns(self, device: torch.device | str = "cpu") -> torch.Tensor:
+        """Required lessons as (teacher, class, subject) rows on ``device``."""
+        return self.on_device(
+            "lesson_columns", device, lambda: self.required_lessons.to(device)
+        )
+
+    @cached_property
+    def teacher_lessons_ids(self) -> torch.Tensor:
+        return self.teachers == torch.arange(self.shape[0])[:, None]
+
+    @cached_property
+    def classes_lessons_ids(self) -> torch.Tensor:
+        return self.classes == torch.arange(self.shape[1])[:, None]
+
+
+def set_num_threads(
+    num_threads: int = NUM_THREADS, num_interop_threads: int = NUM_INTEROP_THREADS
+) -> None:
+    """Call before any torch work, torch refuses to resize the inter-op pool
+    once it was used."""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        torch.set_num_interop_threads(num_interop_threads)
+
+
+def get_device(device: str | None = None) -> torch.device:
+    """``device``, else ``DEVICE``, else CUDA if available and the CPU
+    otherwise."""
+    device = device or DEVICE
+    if not device:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.device(device)
+
+
+@cache
+def load_problem(
+    constraints_path: str | Path = DEFAULT_CONSTRAINTS_PATH,
+    max_classes: int = MAX_CLASSES,
+) -> Problem:
+    return Problem(constraints_path, max_classes)
+
 
 GLOBAL_COMPLEMENTARY = [
     (11, 12, 14),  # Language groups
@@ -87,12 +216,13 @@ SUBJECTS_LOOKUP_DICT = {
 }
 
 if __name__ == "__main__":
-    print(CLASSES.unique().shape[0])
-    print(REQUIRED_LESSONS)
-    print(REQUIRED_LESSONS.shape)
-    
-    print(TEACHERS.unique().shape[0])
-    print(SUBJECTS.unique().shape[0])
-    print(CLASSES.unique().shape[0])
-    
-    print(CONSTRAINTS.sum())
+    problem = load_problem()
+    print(problem.classes.unique().shape[0])
+    print(problem.required_lessons)
+    print(problem.required_lessons.shape)
+
+    print(problem.teachers.unique().shape[0])
+    print(problem.subjects.unique().shape[0])
+    print(problem.classes.unique().shape[0])
+
+    print(problem.constraints.sum())
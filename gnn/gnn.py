@@ -1,136 +1,345 @@
-from itertools import combinations
+import json
+import os
+from pathlib import Path
 
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from constants import *
+from graph_cache import load_or_build_graph
 from helpers import *
-from torch_geometric.data import Data
-from torch_geometric.nn import FastRGCNConv
+from torch_geometric.data import Batch, Data
+from torch_geometric.nn import (
+    AttentionalAggregation,
+    FastRGCNConv,
+    MeanAggregation,
+    RGCNConv,
+)
 
 
-def get_data() -> Data:
-    edges, types = [], []
-    for (i1, (t1, c1, s1)), (i2, (t2, c2, s2)) in combinations(
-        enumerate(REQUIRED_LESSONS), 2
-    ):
-        edge_type = 0  # Neutral
-        if are_complementary(s1, s2, c1, c2):
-            edge_type = 4
-        elif are_compatible(s1, s2, c1, c2, t1, t2):
-            edge_type = 3
-        elif t1 == t2:
-            edge_type = 2
-        elif c1 == c2:
-            edge_type = 1
-
-        if edge_type:
-            types.extend([edge_type, edge_type])
-            edges.extend([(i1, i2), (i2, i1)])
-
-    edge_index = torch.tensor(edges).T
-    edge_type = torch.tensor(types) - 1
+def build_data(problem: Problem) -> Data:
+    edge_index, edge_type = get_edges(problem)
 
     return Data(
-        x=get_initial_lesson_ebeddings(),
+        x=get_initial_lesson_ebeddings(problem),
         edge_index=edge_index,
         edge_type=edge_type,
     )
 
 
+def get_data(problem: Problem, use_cache: bool = True, sparse: bool = False) -> Data:
+    data = (
+        build_data(problem)
+        if not use_cache
+        else load_or_build_graph(problem, build_data)
+    )
+    if sparse:
+        data = sparse_data(data)
+    return data
+
+
+def sparse_data(data: Data, num_relations: int = 4) -> Data:
+    """``data`` with the CSR adjacency of ``lesson_adjacency`` as ``adj_t``
+    in place of ``edge_index`` and ``edge_type``."""
+    return Data(
+        x=data.x,
+        adj_t=lesson_adjacency(
+            data.edge_index, data.edge_type, data.num_nodes, num_relations
+        ),
+        num_nodes=data.num_nodes,
+    )
+
+
+def adjacency(data: Data) -> tuple[torch.Tensor, torch.Tensor | None]:
+    """Graph arguments of RGCNModel: ``adj_t`` of sparse data, otherwise
+    ``edge_index`` and ``edge_type``."""
+    if "adj_t" in data:
+        return data.adj_t, None
+    return data.edge_index, data.edge_type
+
+
+def graph_inputs(data: Data) -> tuple[torch.Tensor, ...]:
+    """``adjacency`` without the missing ``edge_type`` of sparse data, for
+    unbatched calls and TorchScript, which takes no ``None`` arguments."""
+    return tuple(t for t in adjacency(data) if t is not None)
+
+
+class CSRRGCNConv(RGCNConv):
+    """RGCNConv over the CSR adjacency of ``lesson_adjacency``, one sparse
+    matmul for all relations.
+
+    ``x`` may stack several samples of the same graph along the nodes, they
+    share the adjacency instead of being copied into a block-diagonal one.
+    Parameters match RGCNConv and FastRGCNConv, so weights carry over.
+    """
+
+    def forward(self, x, edge_index, edge_type=None):
+        n_nodes = edge_index.shape[0]
+        x = x.view(-1, n_nodes, self.in_channels_l)
+        n_samples = x.shape[0]
+        # Every relation's transform of every sample: (relations * nodes, samples * out)
+        h = torch.einsum("sni,rio->rnso", x, self.weight)
+        out = edge_index @ h.reshape(-1, n_samples * self.out_channels)
+        out = out.view(n_nodes, n_samples, -1).transpose(0, 1)
+        out = out + x @ self.root + self.bias
+        return out.reshape(-1, self.out_channels)
+
+
 class RGCNModel(nn.Module):
+    """Relational GCN scoring every lesson for the current slot.
+
+    ``head="dense"`` reads all lesson embeddings at once, its size grows with
+    the square of ``num_of_lessons`` and fixes the model to one school.
+    ``head="node"`` scores each lesson with a shared MLP, optionally given a
+    ``"mean"`` or ``"attention"`` readout of its graph, so it works on graphs
+    of any size.
+    """
+
     def __init__(
         self,
         in_channels,
         hidden_channels,
+        num_of_lessons=None,
         out_channels=3,
         num_relations=4,
-        num_of_lessons=REQUIRED_LESSONS.shape[0],
+        head="dense",
+        readout=None,
+        sparse=False,
     ):
         super(RGCNModel, self).__init__()
-        self.num_of_lessons = num_of_lessons
-        self.unique_classes: torch.Tensor = CLASSES.unique()
-        self.classes_dic = torch.cat(
-            (CLASSES, torch.arange(0, self.unique_classes.shape[0]))
+        # Saved with checkpoints, to rebuild the model before loading weights
+        self.config = dict(
+            in_channels=in_channels,
+            hidden_channels=hidden_channels,
+            num_of_lessons=num_of_lessons,
+            out_channels=out_channels,
+            num_relations=num_relations,
+            head=head,
+            readout=readout,
+            sparse=sparse,
         )
+        self.num_of_lessons = num_of_lessons
+        self.head = head
 
+        conv = CSRRGCNConv if sparse else FastRGCNConv
         self.graph_layer_list = nn.ModuleList(
             [
-                FastRGCNConv(in_channels, hidden_channels, num_relations),
-                FastRGCNConv(hidden_channels, hidden_channels, num_relations),
-                FastRGCNConv(hidden_channels, hidden_channels, num_relations),
-                FastRGCNConv(hidden_channels, out_channels, num_relations),
-                FastRGCNConv(out_channels, out_channels, num_relations),
+                conv(in_channels, hidden_channels, num_relations),
+                conv(hidden_channels, hidden_channels, num_relations),
+                conv(hidden_channels, hidden_channels, num_relations),
+                conv(hidden_channels, out_channels, num_relations),
+                conv(out_channels, out_channels, num_relations),
             ]
         )
 
-        self.post_graph_layer = nn.Sequential(
-            nn.Linear(out_channels * num_of_lessons, out_channels * num_of_lessons),
-            nn.Tanh(),
-            nn.Linear(out_channels * num_of_lessons, out_channels * num_of_lessons),
-            nn.Tanh(),
-            nn.Linear(out_channels * num_of_lessons, num_of_lessons),
-            nn.Sigmoid(),
-        )
+        if head == "dense":
+            self.post_graph_layer = nn.Sequential(
+                nn.Linear(out_channels * num_of_lessons, out_channels * num_of_lessons),
+                nn.Tanh(),
+                nn.Linear(out_channels * num_of_lessons, out_channels * num_of_lessons),
+                nn.Tanh(),
+                nn.Linear(out_channels * num_of_lessons, num_of_lessons),
+                nn.Sigmoid(),
+            )
+        elif head == "node":
+            self.readout = None
+            if readout == "mean":
+                self.readout = MeanAggregation()
+            elif readout == "attention":
+                self.readout = AttentionalAggregation(nn.Linear(out_channels, 1))
+            elif readout is not None:
+                raise ValueError(f"Unknown readout {readout!r}")
+            node_channels = 2 * out_channels if readout else out_channels
+            self.node_layer = nn.Sequential(
+                nn.Linear(node_channels, hidden_channels),
+                nn.Tanh(),
+                nn.Linear(hidden_channels, hidden_channels),
+                nn.Tanh(),
+                nn.Linear(hidden_channels, 1),
+                nn.Sigmoid(),
+            )
+        else:
+            raise ValueError(f"Unknown head {head!r}")
 
-    def forward(self, x, edge_index, edge_type):
+    def forward(self, x, edge_index, edge_type=None, batch=None):
         for layer in self.graph_layer_list:
             x = layer(x, edge_index=edge_index, edge_type=edge_type)
             x = F.relu(x)
-        x = self.post_graph_layer(x.view(-1))
 
-        return x
+        if self.head == "dense":
+            # One row of flattened lesson embeddings per graph of the batch
+            x = self.post_graph_layer(x.view(-1, self.num_of_lessons * x.shape[1]))
+            return x.view(-1)
+
+        if self.readout is not None:
+            n_graphs = None
+            if batch is None:
+                batch = torch.zeros(x.shape[0], dtype=torch.long, device=x.device)
+                n_graphs = 1
+            x = torch.cat([x, self.readout(x, batch, dim_size=n_graphs)[batch]], dim=1)
+        return self.node_layer(x).view(-1)
+
+
+def save_checkpoint(
+    path: str | Path,
+    model: RGCNModel,
+    optimizer: torch.optim.Optimizer,
+    epoch: int,
+) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(
+        {
+            "config": model.config,
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "epoch": epoch,
+        },
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(
+    path: str | Path, device: torch.device | str = "cpu"
+) -> tuple[RGCNModel, torch.optim.Optimizer, int]:
+    """Model and optimizer of a checkpoint, and the number of epochs it was
+    trained for."""
+    checkpoint = torch.load(path, map_location=device, weights_only=True)
+    model = RGCNModel(**checkpoint["config"]).to(device)
+    model.load_state_dict(checkpoint["model"])
+    optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+    optimizer.load_state_dict(checkpoint["optimizer"])
+    return model, optimizer, checkpoint["epoch"]
+
+
+MODEL_CONFIG_FILE = "config.json"
+
+
+def export_torchscript(model: RGCNModel, data: Data, path: str | Path) -> None:
+    """Traces ``model`` on ``data`` and saves it for inference without the
+    Python model code."""
+    model.eval()
+    with torch.no_grad():
+        # The trace check cannot clone sparse inputs
+        traced = torch.jit.trace(
+            model,
+            (data.x, *graph_inputs(data)),
+            check_trace=not model.config["sparse"],
+        )
+    # The config tells the loader which graph layout the trace expects
+    torch.jit.save(
+        traced, path, _extra_files={MODEL_CONFIG_FILE: json.dumps(model.config)}
+    )
+
+
+def batched_graph(data: Data, n_samples: int) -> Batch:
+    """``n_samples`` disjoint copies of the lesson graph, for one forward pass
+    over several noisy embeddings.
+
+    Sparse data keeps its single ``adj_t``, CSRRGCNConv shares it between
+    the samples.
+    """
+    if "adj_t" in data:
+        graph = Batch.from_data_list([Data(num_nodes=data.num_nodes)] * n_samples)
+        graph.adj_t = data.adj_t
+        return graph
+    graph = Data(
+        edge_index=data.edge_index,
+        edge_type=data.edge_type,
+        num_nodes=data.num_nodes,
+    )
+    return Batch.from_data_list([graph] * n_samples)
+
+
+def rollout(
+    model: RGCNModel,
+    graph: Batch,
+    embeddings: torch.Tensor,
+    noise_scale: float = NOISE_SCALE,
+) -> torch.Tensor:
+    """Slot probabilities ``(samples, lessons)`` for noisy copies of
+    ``embeddings``."""
+    x = embeddings.repeat(graph.num_graphs, 1)
+    result = model(
+        x + torch.rand_like(x) * noise_scale,
+        *adjacency(graph),
+        graph.batch,
+    )
+    return result.view(graph.num_graphs, -1)
+
+
+def best_sample(score: torch.Tensor, valid: torch.Tensor) -> torch.Tensor:
+    """Index of the best scoring valid sample, or of the best one if none is
+    valid."""
+    total = score.sum(1)
+    return torch.where(valid | ~valid.any(), total, -torch.inf).argmax()
 
 
 if __name__ == "__main__":
-    data = get_data()
-    device = torch.device("cuda:0")
+    set_num_threads()
+    problem = load_problem()
+    REQUIRED_LESSONS = problem.required_lessons
+    device = get_device()
 
-    model = RGCNModel(FEATURE_DIM, 10)
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-    model.to(device)
-    data.to(device)
+    if os.path.exists(CHECKPOINT_PATH):
+        model, optimizer, start_epoch = load_checkpoint(CHECKPOINT_PATH, device)
+    else:
+        model = RGCNModel(
+            FEATURE_DIM,
+            10,
+            problem.n_lessons,
+            head=MODEL_HEAD,
+            readout=MODEL_READOUT,
+            sparse=SPARSE_ADJACENCY,
+        )
+        optimizer = torch.optim.Adam(model.parameters(), lr=LEARNING_RATE)
+        model.to(device)
+        start_epoch = 0
+    # A resumed model keeps the graph layout it was trained with
+    data = get_data(problem, sparse=model.config.get("sparse", False)).to(device)
 
-    valid = False
+    graph = batched_graph(data, ROLLOUT_SAMPLES)
     embeddings = data.x
-    old_selected = torch.zeros_like(CLASSES, device=device)
+    old_selected = torch.zeros(problem.n_lessons, dtype=torch.bool, device=device)
     i = 0
-    for _ in range(4):
+    for epoch in range(start_epoch, start_epoch + 4):
         embeddings = data.x
         print("--------------------------")
         for _ in range(8):
             j = 0
-            while not valid and j < 1000:
+            valid = torch.zeros(ROLLOUT_SAMPLES, dtype=torch.bool, device=device)
+            while not valid.any() and j < MAX_ROLLOUT_SAMPLES:
                 optimizer.zero_grad()
-                result = model(
-                    embeddings + torch.rand_like(embeddings) * 0.01,
-                    data.edge_index,
-                    data.edge_type,
-                )
+                result = rollout(model, graph, embeddings)
                 selected = result > THRESHOLD
 
-                score, valid = get_score(selected, embeddings.to("cpu"))
+                score, valid = get_score(problem, selected, embeddings)
 
                 f_o: torch.Tensor = result * score
-                loss = -f_o.sum()
+                loss = -f_o.sum(1).mean()
 
                 loss.backward()
                 optimizer.step()
 
-                j += 1
+                j += ROLLOUT_SAMPLES
             i += 1
-            
-            embeddings = step_on_selected(embeddings, selected, old_selected)
+            selected = selected[best_sample(score, valid)]
+
+            embeddings = step_on_selected(problem, embeddings, selected, old_selected)
 
             # print(-loss.item())
             # print(selected.sum().item(), valid)
             # print(valid)
-            for c in range(6):
-                lesson_name = ""
-                for s in REQUIRED_LESSONS[
-                    torch.logical_and(CLASSES == c, selected.to("cpu"))
-                ][:, 2]:
-                    lesson_name = "/".join([lesson_name, SUBJECTS_LOOKUP_DICT[s.item()]])
-                print(f"{lesson_name[1:]:^28}", end=" | ")
+            # One copy to the host per slot, for printing only
+            slot_lessons = REQUIRED_LESSONS[selected.cpu()].tolist()
+            for c in range(problem.max_classes):
+                lesson_name = "/".join(
+                    SUBJECTS_LOOKUP_DICT[s]
+                    for _, lesson_class, s in slot_lessons
+                    if lesson_class == c
+                )
+                print(f"{lesson_name:^28}", end=" | ")
             print()
-            valid = False
+
+        save_checkpoint(CHECKPOINT_PATH, model, optimizer, epoch + 1)
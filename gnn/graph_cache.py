@@ -0,0 +1,60 @@
+import hashlib
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+import torch
+from constants import DEFAULT_CONSTRAINTS_PATH, FEATURE_DIM, Problem
+from torch_geometric.data import Data
+
+CACHE_DIR = DEFAULT_CONSTRAINTS_PATH.parent / "graph_cache"
+# Bump when get_edges or the initial embeddings change meaning
+CACHE_VERSION = 1
+
+
+def graph_cache_key(problem: Problem) -> str:
+    digest = hashlib.sha256()
+    if problem.constraints_path is None:
+        # Built in memory, e.g. from a stored RequirementSet
+        constraints = problem.constraints.contiguous()
+        digest.update(repr((constraints.shape, constraints.dtype)).encode())
+        digest.update(constraints.numpy().tobytes())
+    else:
+        with open(problem.constraints_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    rules = (
+        CACHE_VERSION,
+        FEATURE_DIM,
+        problem.max_classes,
+        problem.global_complementary,
+        sorted(problem.per_class_complementary.items()),
+        sorted(problem.group_subjects.items()),
+    )
+    digest.update(repr(rules).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_or_build_graph(
+    problem: Problem,
+    build: Callable[[Problem], Data],
+    cache_dir: str | Path = CACHE_DIR,
+) -> Data:
+    """Returns the cached graph of ``problem`` or builds and caches it.
+
+    Cached tensors are memory-mapped, so loading does not read the file up
+    front.
+    """
+    path = os.path.join(cache_dir, f"{graph_cache_key(problem)}.pt")
+    if os.path.exists(path):
+        return Data(**torch.load(path, mmap=True, weights_only=True))
+
+    data = build(problem)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(
+        {"x": data.x, "edge_index": data.edge_index, "edge_type": data.edge_type},
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+    return data
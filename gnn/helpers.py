@@ -2,42 +2,110 @@ from constants import *
 import torch
 
 
-def are_complementary(s_1: int, s_2: int, c_1: int, c_2: int) -> bool:
-    g = PER_CLASS_COMPLEMENTARY.get(c_1)
-    return (c_1 == c_2) and (
-        any(s_1 in grp and s_2 in grp for grp in GLOBAL_COMPLEMENTARY)
-        or (g and any(s_1 in grp and s_2 in grp for grp in g))
-    )
+def complementary_table(problem: Problem) -> torch.Tensor:
+    """``table[c, s1, s2]`` is True when a complementary group of class ``c``
+    (global or per class) holds both subjects."""
+    _, n_classes, n_subjects = problem.shape
+    table = torch.zeros(n_classes, n_subjects, n_subjects, dtype=torch.bool)
+    rules = [
+        (slice(None), problem.global_complementary),
+        *problem.per_class_complementary.items(),
+    ]
+    for classes, groups in rules:
+        for group in groups:
+            subjects = torch.tensor(group)
+            table[classes, subjects[:, None], subjects[None, :]] = True
+    return table
 
 
-def are_compatible(s_1: int, s_2: int, c_1: int, c_2: int, t_1: int, t_2: int) -> bool:
-    g = GLOBAL_GROUP_SUBJECTS.get(s_1.item())
-    return (
-        s_1 == s_2
-        and g
-        and t_1 == t_2
-        and t_1 in g[0]
-        and any(c_1 in grp and c_2 in grp for grp in g[1:])
-    )
+def compatible_tables(problem: Problem) -> tuple[torch.Tensor, torch.Tensor]:
+    """``teachers[s, t]`` marks the teachers that may group subject ``s``,
+    ``classes[s, c1, c2]`` the class pairs that may share one of its lessons."""
+    n_teachers, n_classes, n_subjects = problem.shape
+    teachers = torch.zeros(n_subjects, n_teachers, dtype=torch.bool)
+    classes = torch.zeros(n_subjects, n_classes, n_classes, dtype=torch.bool)
+    for subject, (group_teachers, *class_groups) in problem.group_subjects.items():
+        teachers[subject, list(group_teachers)] = True
+        for group in class_groups:
+            group = torch.tensor(group)
+            classes[subject, group[:, None], group[None, :]] = True
+    return teachers, classes
+
 
+def get_edges(problem: Problem) -> tuple[torch.Tensor, torch.Tensor]:
+    """Typed edges between every pair of lessons, both directions.
 
-def are_subjects_complementary(subjects: torch.Tensor, c: int) -> bool:
-    for group in GLOBAL_COMPLEMENTARY + PER_CLASS_COMPLEMENTARY.get(c, []):
-        if len(subjects) == len(group) and all(s in group for s in subjects):
-            return True
-    return False
+    Types by priority: 3 complementary, 2 compatible, 1 same teacher,
+    0 same class. Pairs come in ``combinations`` order.
+    """
+    lessons = problem.required_lessons
+    n_teachers, n_classes, n_subjects = problem.shape
+    t, c, s = lessons.T
+    complementary = complementary_table(problem)
+    compatible_teachers, compatible_classes = compatible_tables(problem)
 
+    same_teacher = t[:, None] == t[None, :]
+    same_class = c[:, None] == c[None, :]
+    same_subject = s[:, None] == s[None, :]
 
-def are_lessons_grouped(subjects: torch.Tensor) -> bool:
-    if tmp := GLOBAL_GROUP_SUBJECTS.get(subjects[0, 2].item()):
-        if subjects[0, 0].item() in tmp[0]:
-            if any(all(c in g for c in subjects[:, 1]) for g in tmp[1:]):
-                return True
-    return False
+    edge_type = torch.zeros(lessons.shape[0], lessons.shape[0], dtype=torch.long)
+    edge_type[same_class] = 1
+    edge_type[same_teacher] = 2
+    edge_type[
+        same_subject
+        & same_teacher
+        & compatible_teachers[s, t][:, None]
+        & compatible_classes[s[:, None], c[:, None], c[None, :]]
+    ] = 3
+    edge_type[same_class & complementary[c[:, None], s[:, None], s[None, :]]] = 4
 
+    i, j = edge_type.triu(1).nonzero(as_tuple=True)
+    edge_index = torch.stack([i, j, j, i], dim=1).reshape(-1, 2).T
+    return edge_index, edge_type[i, j].repeat_interleave(2) - 1
 
-def get_initial_lesson_ebeddings() -> torch.Tensor:
-    embeddings = torch.zeros(REQUIRED_LESSONS.shape[0], FEATURE_DIM)
+
+def lesson_adjacency(
+    edge_index: torch.Tensor,
+    edge_type: torch.Tensor,
+    num_nodes: int,
+    num_relations: int,
+) -> torch.Tensor:
+    """Mean-normalised adjacency of every relation, side by side in one
+    ``(nodes, relations * nodes)`` CSR matrix.
+
+    Each lesson pair is kept once and mirrored, so duplicated edges do not
+    count twice in the mean.
+    """
+    src, dst = edge_index
+    pairs = src < dst
+    rows = torch.cat([src[pairs], dst[pairs]])
+    columns = torch.cat([dst[pairs], src[pairs]])
+    columns += edge_type[pairs].repeat(2) * num_nodes
+
+    shape = (num_nodes, num_relations * num_nodes)
+    # coalesce drops pairs listed more than once
+    indices = (
+        torch.sparse_coo_tensor(
+            torch.stack([rows, columns]),
+            torch.ones(rows.shape[0]),
+            shape,
+            check_invariants=False,
+        )
+        .coalesce()
+        .indices()
+    )
+    # Mean over the neighbours of each (lesson, relation)
+    segments = indices[0] * num_relations + indices[1] // num_nodes
+    degree = torch.zeros(num_nodes * num_relations).index_add_(
+        0, segments, torch.ones(segments.shape[0])
+    )
+    return torch.sparse_coo_tensor(
+        indices, 1 / degree[segments], shape, check_invariants=False
+    ).to_sparse_csr()
+
+
+def get_initial_lesson_ebeddings(problem: Problem) -> torch.Tensor:
+    embeddings = torch.zeros(problem.n_lessons, FEATURE_DIM)
     # 0 Remaining lessons
     # 1 Lessons in that day per class
     # 2 Lessons in that day per teacher
@@ -46,93 +114,214 @@ def get_initial_lesson_ebeddings() -> torch.Tensor:
     # 5 Is prievous the same
     # 6 No of the same lessons in that day
 
-    embeddings[:, 0] = CONSTRAINTS[*REQUIRED_LESSONS.T]
+    embeddings[:, 0] = problem.constraints[*problem.required_lessons.T]
 
     return embeddings
 
 
 def step_on_selected(
-    current_embeddings: torch.Tensor, selected: torch.Tensor, old_selected: torch.Tensor
+    problem: Problem,
+    current_embeddings: torch.Tensor,
+    selected: torch.Tensor,
+    old_selected: torch.Tensor,
 ) -> torch.Tensor:
+    n_teachers, n_classes, _ = problem.shape
+    teachers, classes, _ = problem.lesson_columns(selected.device).T
     embeddings = current_embeddings.clone()
+    selected_ = selected.type_as(embeddings)
 
-    embeddings[:, 0] -= selected.type_as(embeddings)
+    embeddings[:, 0] -= selected_
 
-    selected_ = selected.to("cpu")
-    for c in CLASSES.unique():
-        inds = torch.logical_and(CLASSES == c, selected_)
-        embeddings[CLASSES == c, 1] += selected_[inds].sum().clip(0, 1)
+    # Whether each class / teacher has a lesson in this slot
+    class_busy = embeddings.new_zeros(n_classes).index_add_(0, classes, selected_)
+    class_busy = class_busy.clip(0, 1)[classes]
+    teacher_busy = embeddings.new_zeros(n_teachers).index_add_(0, teachers, selected_)
+    teacher_busy = teacher_busy.clip(0, 1)[teachers]
 
-    for t in TEACHERS.unique():
-        teacher_inds = TEACHERS == t
-        inds = torch.logical_and(teacher_inds, selected_)
-        is_selected = selected_[inds].sum().clip(0, 1)
-        embeddings[teacher_inds, 2] += is_selected
-
-        if current_embeddings[teacher_inds, 2][0] > 0 and is_selected == 0:
-            embeddings[teacher_inds, 3] += 1
+    embeddings[:, 1] += class_busy
+    embeddings[:, 2] += teacher_busy
+    # A free slot after the teacher's first lesson of the day is a window
+    embeddings[:, 3] += (current_embeddings[:, 2] > 0) & (teacher_busy == 0)
 
     embeddings[:, 4] += 1
     embeddings[:, 5] = torch.logical_and(selected, old_selected)
-    embeddings[:, 6] += selected.type_as(embeddings)
+    embeddings[:, 6] += selected_
 
     return embeddings
 
 
+def score_tables(problem: Problem, device: torch.device | str) -> dict:
+    """Rule tables of ``get_score`` for ``problem``, built once per device.
+
+    Complementary groups and the class groups of grouped subjects are stored
+    as 0/1 matrices of the subjects / classes outside of them, so "every
+    selected subject is in the group" becomes ``presence @ outside == 0``
+    for any number of subjects and classes.
+    """
+
+    def build() -> dict:
+        n_teachers, n_classes, n_subjects = problem.shape
+
+        rules = [(slice(None), group) for group in problem.global_complementary] + [
+            (c, group)
+            for c, groups in problem.per_class_complementary.items()
+            if c < n_classes
+            for group in groups
+        ]
+        group_subjects = torch.zeros(len(rules), n_subjects, dtype=torch.bool)
+        group_classes = torch.zeros(n_classes, len(rules), dtype=torch.bool)
+        for g, (classes, group) in enumerate(rules):
+            group_subjects[g, list(group)] = True
+            group_classes[classes, g] = True
+
+        compatible_teachers, _ = compatible_tables(problem)
+        max_groups = max(
+            (len(groups) - 1 for groups in problem.group_subjects.values()), default=0
+        )
+        class_groups = torch.zeros(n_subjects, max_groups, n_classes, dtype=torch.bool)
+        for subject, (_, *groups) in problem.group_subjects.items():
+            for g, group in enumerate(groups):
+                class_groups[subject, g, list(group)] = True
+
+        tables = {
+            "complementary_outside": (~group_subjects).float().T,
+            "complementary_sizes": torch.tensor(
+                [len(g) for _, g in rules], dtype=torch.long
+            ),
+            "complementary_classes": group_classes,
+            "compatible_teachers": compatible_teachers,
+            "class_group_outside": (~class_groups).float().flatten(0, 1).T,
+            "class_group_nonempty": class_groups.any(2),
+        }
+        return {name: table.to(device) for name, table in tables.items()}
+
+    return problem.on_device("score_tables", device, build)
+
+
+def segment_presence(
+    selected: torch.Tensor,
+    segments: torch.Tensor,
+    n_segments: int,
+    values: torch.Tensor,
+    n_values: int,
+) -> torch.Tensor:
+    """``(B, n_segments, n_values)`` marks of the values selected per segment."""
+    presence = torch.zeros(
+        selected.shape[0],
+        n_segments * n_values,
+        dtype=torch.long,
+        device=selected.device,
+    )
+    presence.index_add_(1, segments * n_values + values, selected.long())
+    return presence.view(-1, n_segments, n_values) > 0
+
+
 def get_score(
-    selected_: torch.Tensor, current_embeddings: torch.Tensor
-) -> tuple[torch.Tensor, bool]:
-    # T C S
-    valid = True
+    problem: Problem, selected: torch.Tensor, current_embeddings: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Per lesson reward of a slot selection and whether the selection is valid.
+
+    ``selected`` is either one ``(L,)`` selection or a ``(B, L)`` batch of
+    them, scored against the same ``current_embeddings``. Classes and
+    teachers are scored with segment reductions over the lesson columns,
+    everything stays on the device of ``selected``.
+    """
+    n_teachers, n_classes, n_subjects = problem.shape
+    device = selected.device
+    teachers, classes, subjects = problem.lesson_columns(device).T
+    tables = score_tables(problem, device)
+
+    batched = selected.dim() == 2
     with torch.no_grad():
-        selected = selected_.to("cpu")
-        final_score = torch.zeros_like(selected, dtype=torch.float32)
-
-        requirement_mask = torch.logical_and(current_embeddings[:, 0] <= 0.1, selected)
-        final_score[requirement_mask] += -20
-        if requirement_mask.any():
-            valid = False
-        final_score[~requirement_mask] += 0.5
-
-        for c in CLASSES.unique():
-            inds = torch.logical_and(CLASSES == c, selected)
-            lessons = REQUIRED_LESSONS[inds]
-
-            if lessons.shape[0] == 0:
-                if current_embeddings[:, 1].any():
-                    final_score[CLASSES == c] += 1
-                    valid = False
-                final_score[CLASSES == c] += 0.5
-                pass
-            else:
-                if lessons.shape[0] == 1:
-                    final_score[inds] += 2
-                else:
-                    if are_subjects_complementary(lessons[:, 2], c):
-                        final_score[inds] += 4
-                    else:
-                        valid = False
-                        final_score[inds] += -20
-
-        for t in TEACHERS.unique():
-            inds = torch.logical_and(TEACHERS == t, selected)
-            lessons = REQUIRED_LESSONS[inds]
-
-            if lessons.shape[0] == 0:
-                final_score[TEACHERS == t] += 0
-            elif not are_lessons_grouped(lessons):
-                if lessons.shape[0] == 1:
-                    final_score[inds] += 2
-                else:
-                    valid = False
-                    final_score[inds] += -20
-            else:
-                final_score[inds] += 4
-
-        invalid_mask = torch.logical_and(current_embeddings[:, 6] >= 1.9, selected)
-        if invalid_mask.any():
-            final_score[invalid_mask] += -20
-            final_score[~invalid_mask] += 0.5
-            valid = False
-
-        return final_score.to(selected_.device), valid
+        selected = selected.bool().view(-1, problem.n_lessons)
+        n_samples, n_lessons = selected.shape
+        current_embeddings = current_embeddings.to(device)
+        final_score = torch.zeros(selected.shape, device=device)
+
+        requirement_mask = (current_embeddings[:, 0] <= 0.1) & selected
+        final_score += torch.where(requirement_mask, -20.0, 0.5)
+        valid = ~requirement_mask.any(1)
+
+        # Classes: one lesson, or a complementary set of subjects
+        class_counts = torch.zeros(
+            n_samples, n_classes, dtype=torch.long, device=device
+        )
+        class_counts.index_add_(1, classes, selected.long())
+        class_subjects = segment_presence(
+            selected, classes, n_classes, subjects, n_subjects
+        )
+        # Selected subjects of each class outside of each complementary group
+        outside_group = class_subjects.float() @ tables["complementary_outside"]
+        class_complementary = (
+            tables["complementary_classes"]
+            & (class_counts[..., None] == tables["complementary_sizes"])
+            & (outside_group == 0)
+        ).any(2)
+
+        lesson_class_counts = class_counts[:, classes]
+        empty_class = lesson_class_counts == 0
+        # A class without a lesson once the day has started leaves a gap
+        day_started = current_embeddings[:, 1].any()
+        final_score += empty_class * (0.5 + day_started.float())
+        valid &= ~(empty_class.any(1) & day_started)
+
+        single = selected & (lesson_class_counts == 1)
+        multiple = selected & (lesson_class_counts > 1)
+        clash = multiple & ~class_complementary[:, classes]
+        final_score += 2 * single
+        final_score += torch.where(multiple & ~clash, 4.0, 0.0)
+        final_score += torch.where(clash, -20.0, 0.0)
+        valid &= ~clash.any(1)
+
+        # Teachers: one lesson, or one grouped lesson shared by several classes
+        teacher_counts = torch.zeros(
+            n_samples, n_teachers, dtype=torch.long, device=device
+        )
+        teacher_counts.index_add_(1, teachers, selected.long())
+        lesson_ids = torch.arange(n_lessons, device=device)
+        first_lesson = torch.full(
+            (n_samples, n_teachers), n_lessons, dtype=torch.long, device=device
+        )
+        first_lesson.scatter_reduce_(
+            1,
+            teachers.expand(n_samples, -1),
+            torch.where(selected, lesson_ids, n_lessons),
+            "amin",
+        )
+        first_subject = subjects[first_lesson.clip(max=n_lessons - 1)]
+        allowed = tables["compatible_teachers"][
+            first_subject, torch.arange(n_teachers, device=device)
+        ]
+        teacher_classes = segment_presence(
+            selected, teachers, n_teachers, classes, n_classes
+        )
+        # Classes of each teacher outside of each class group of every subject,
+        # then only the groups of the teacher's first subject are kept
+        class_group_nonempty = tables["class_group_nonempty"]
+        outside_group = (teacher_classes.float() @ tables["class_group_outside"]).view(
+            n_samples, n_teachers, n_subjects, class_group_nonempty.shape[1]
+        )
+        outside_group = outside_group[
+            torch.arange(n_samples, device=device)[:, None],
+            torch.arange(n_teachers, device=device),
+            first_subject,
+        ]
+        in_group = class_group_nonempty[first_subject] & (outside_group == 0)
+        teacher_grouped = (allowed & in_group.any(2))[:, teachers]
+
+        grouped = selected & teacher_grouped
+        lesson_teacher_counts = teacher_counts[:, teachers]
+        overbooked = selected & ~teacher_grouped & (lesson_teacher_counts > 1)
+        final_score += 4 * grouped
+        final_score += 2 * (selected & ~teacher_grouped & (lesson_teacher_counts == 1))
+        final_score += torch.where(overbooked, -20.0, 0.0)
+        valid &= ~overbooked.any(1)
+
+        invalid_mask = (current_embeddings[:, 6] >= 1.9) & selected
+        repeated = invalid_mask.any(1, keepdim=True)
+        final_score += torch.where(invalid_mask, -20.0, 0.5) * repeated
+        valid &= ~repeated[:, 0]
+
+        if not batched:
+            return final_score[0], valid[0]
+        return final_score, valid
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from constants import *
+from gnn import (
+    MODEL_CONFIG_FILE,
+    build_data,
+    export_torchscript,
+    graph_inputs,
+    load_checkpoint,
+    sparse_data,
+)
+from helpers import step_on_selected
+from torch_geometric.data import Data
+
+WEBSITE_DIR = Path(__file__).resolve().parent.parent / "website"
+SLOTS_PER_DAY = 8
+TORCHSCRIPT_SUFFIX = ".ts"
+
+
+def setup_django() -> None:
+    sys.path.append(str(WEBSITE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "inzynierka.settings")
+    import django
+
+    django.setup()
+
+
+def requirement_set_problem(
+    req_set_id: int,
+) -> tuple[Problem, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Problem of a stored RequirementSet, with the teacher, group and subject
+    ids behind its indices."""
+    from backend.models import Requirement
+
+    rows = np.array(
+        Requirement.objects.filter(req_set_id=req_set_id, hours__gt=0).values_list(
+            "teacher_id", "group_id", "subject_id", "hours"
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 4)
+    if rows.shape[0] == 0:
+        raise ValueError(f"Requirement set {req_set_id} has no requirements")
+
+    ids, indices = zip(
+        *(np.unique(column, return_inverse=True) for column in rows[:, :3].T)
+    )
+    constraints = np.zeros([len(column_ids) for column_ids in ids], dtype=np.uint8)
+    constraints[indices] = rows[:, 3]
+    problem = Problem.from_constraints(constraints, max_classes=constraints.shape[1])
+    return problem, ids
+
+
+def load_inference_model(
+    path: str | Path, device: torch.device | str = "cpu"
+) -> tuple[torch.nn.Module, dict]:
+    """The model and the RGCNModel config it was built with."""
+    if str(path).endswith(TORCHSCRIPT_SUFFIX):
+        extra_files = {MODEL_CONFIG_FILE: ""}
+        model = torch.jit.load(path, map_location=device, _extra_files=extra_files)
+        if not extra_files[MODEL_CONFIG_FILE]:
+            raise ValueError(f"{path} has no model config, export it again")
+        return model, json.loads(extra_files[MODEL_CONFIG_FILE])
+    model, _, _ = load_checkpoint(path, device)
+    return model.eval(), model.config
+
+
+def suggest_slots(
+    model: torch.nn.Module,
+    config: dict,
+    problem: Problem,
+    n_slots: int = SLOTS_PER_DAY,
+    device: torch.device | str = "cpu",
+    data: Data | None = None,
+) -> list[torch.Tensor]:
+    """Indices of the lessons ``model`` puts into each of ``n_slots``
+    consecutive slots, stepping the embeddings as in training.
+
+    ``config`` is the RGCNModel config of ``model``, as returned by
+    ``load_inference_model``. Pass the graph of ``problem`` as ``data`` to
+    skip building it."""
+    num_of_lessons = config["num_of_lessons"]
+    if config["head"] == "dense" and num_of_lessons != problem.n_lessons:
+        raise ValueError(
+            f"The dense head was trained for {num_of_lessons} lessons, "
+            f"this problem has {problem.n_lessons}"
+        )
+
+    if data is None:
+        data = build_data(problem)
+        # Checkpoints from before the sparse option are COO models
+        if config.get("sparse", False):
+            data = sparse_data(data)
+    data = data.to(device)
+    embeddings = data.x
+    old_selected = torch.zeros(problem.n_lessons, dtype=torch.bool, device=device)
+    slots = []
+    with torch.inference_mode():
+        for _ in range(n_slots):
+            selected = model(embeddings, *graph_inputs(data)) > THRESHOLD
+            embeddings = step_on_selected(problem, embeddings, selected, old_selected)
+            slots.append(selected.nonzero().flatten())
+    return slots
+
+
+def suggest_for_requirement_set(
+    model: torch.nn.Module,
+    config: dict,
+    req_set_id: int,
+    n_slots: int = SLOTS_PER_DAY,
+    device: torch.device | str = "cpu",
+) -> list[list[dict]]:
+    """Suggested lessons per slot of one day, as teacher, group and subject
+    ids of the RequirementSet."""
+    problem, (teacher_ids, group_ids, subject_ids) = requirement_set_problem(req_set_id)
+    lessons = problem.required_lessons.numpy()
+    return [
+        [
+            {
+                "teacher": int(teacher_ids[t]),
+                "group": int(group_ids[c]),
+                "subject": int(subject_ids[s]),
+            }
+            for t, c, s in lessons[slot.cpu().numpy()]
+        ]
+        for slot in suggest_slots(model, config, problem, n_slots, device)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Suggests lessons for the slots of one day of a RequirementSet"
+    )
+    parser.add_argument("req_set_id", type=int)
+    parser.add_argument(
+        "--checkpoint",
+        default=CHECKPOINT_PATH,
+        help=f"Training checkpoint, or a TorchScript model ending with {TORCHSCRIPT_SUFFIX}",
+    )
+    parser.add_argument("--slots", type=int, default=SLOTS_PER_DAY)
+    parser.add_argument("--device", help="Defaults to GNN_DEVICE, then CUDA or CPU")
+    parser.add_argument(
+        "--compile", action="store_true", help="Run the model through torch.compile"
+    )
+    parser.add_argument(
+        "--export-torchscript",
+        metavar="PATH",
+        help="Also save the model traced on this RequirementSet",
+    )
+    args = parser.parse_args()
+
+    set_num_threads()
+    device = get_device(args.device)
+    setup_django()
+    model, config = load_inference_model(args.checkpoint, device)
+    if args.export_torchscript:
+        problem, _ = requirement_set_problem(args.req_set_id)
+        data = build_data(problem)
+        if config.get("sparse", False):
+            data = sparse_data(data)
+        export_torchscript(model, data, args.export_torchscript)
+    if args.compile:
+        model = torch.compile(model, dynamic=True)
+
+    suggestions = suggest_for_requirement_set(
+        model, config, args.req_set_id, args.slots, device
+    )
+    print(json.dumps([{"slot": i, "lessons": s} for i, s in enumerate(suggestions)]))
@@ -3,7 +3,7 @@ from openpyxl.styles import Font
 import numpy as np
 
 
-wb = load_workbook("data/inzynierka.xlsx")
+wb = load_workbook("data/inzynierka.xlsx", read_only=True)
 # ws = wb["Arkusz org 2023-2024"]
 ws = wb["inzynierka"]
 
@@ -18,7 +18,7 @@ with open("student_groups.txt", "w") as file:
 
 subjects = [
     (ind, s.value)
-    for ind, s in enumerate(*ws.iter_cols(max_col=1, min_row=2), start=1)
+    for ind, (s,) in enumerate(ws.iter_rows(max_col=1, min_row=2), start=1)
     if s and s.font and s.font.bold
 ]
 # print(subjects)
@@ -27,7 +27,7 @@ with open("subjects.txt", "w") as file:
 
 teachers = [
     (ind, t.value)
-    for ind, t in enumerate(*ws.iter_cols(max_col=1, min_row=4), start=1)
+    for ind, (t,) in enumerate(ws.iter_rows(max_col=1, min_row=4), start=1)
     if t.value and t.value[-1] in set(map(str, range(10)))
 ]
 # print(teachers)
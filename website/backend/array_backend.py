@@ -0,0 +1,120 @@
+import numpy as np
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+class NumpyBackend:
+    name = "numpy"
+    int = np.int64
+    float = np.float64
+    bool = np.bool_
+
+    def asarray(self, array, dtype=None):
+        return np.asarray(array, dtype=dtype)
+
+    def to_numpy(self, array) -> np.ndarray:
+        return np.asarray(array)
+
+    def astype(self, array, dtype):
+        return array.astype(dtype)
+
+    def zeros(self, shape, dtype=None):
+        return np.zeros(shape, dtype=dtype or self.float)
+
+    def copy(self, array):
+        return array.copy()
+
+    def where(self, condition, a, b):
+        return np.where(condition, a, b)
+
+    def clip(self, array, low=None, high=None):
+        return np.clip(array, low, high)
+
+    def sum(self, array, axis=None):
+        return array.sum(axis=axis)
+
+    def all(self, array) -> bool:
+        return bool(np.all(array))
+
+    def swapaxes(self, array, axis1, axis2):
+        return np.swapaxes(array, axis1, axis2)
+
+    def concatenate(self, arrays, axis=0):
+        return np.concatenate(arrays, axis=axis)
+
+    def random(self, shape):
+        return np.random.random(shape)
+
+    def argsort(self, array, axis=-1):
+        return np.argsort(array, axis=axis, kind="stable")
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, num_threads: int | None = None):
+        if torch is None:
+            raise ImportError("The torch backend requires PyTorch to be installed")
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.int = torch.int64
+        self.float = torch.float64
+        self.bool = torch.bool
+
+    def asarray(self, array, dtype=None):
+        if isinstance(array, np.ndarray) and dtype is None:
+            return torch.from_numpy(array)
+        return torch.as_tensor(np.asarray(array), dtype=dtype)
+
+    def to_numpy(self, array) -> np.ndarray:
+        return array.numpy()
+
+    def astype(self, array, dtype):
+        return array.to(dtype)
+
+    def zeros(self, shape, dtype=None):
+        return torch.zeros(shape, dtype=dtype or self.float)
+
+    def copy(self, array):
+        return array.clone()
+
+    def where(self, condition, a, b):
+        return torch.where(condition, a, b)
+
+    def clip(self, array, low=None, high=None):
+        return torch.clamp(array, low, high)
+
+    def sum(self, array, axis=None):
+        return array.sum() if axis is None else array.sum(dim=axis)
+
+    def all(self, array) -> bool:
+        return bool(torch.all(array))
+
+    def swapaxes(self, array, axis1, axis2):
+        return torch.swapaxes(array, axis1, axis2)
+
+    def concatenate(self, arrays, axis=0):
+        return torch.cat(arrays, dim=axis)
+
+    def random(self, shape):
+        return torch.rand(shape, dtype=self.float)
+
+    def argsort(self, array, axis=-1):
+        return torch.argsort(array, dim=axis, stable=True)
+
+
+BACKENDS = {"numpy": NumpyBackend, "torch": TorchBackend}
+
+
+def get_backend(name: str = "numpy", num_threads: int | None = None):
+    if name == "numpy":
+        return NumpyBackend()
+    if name == "torch":
+        return TorchBackend(num_threads)
+    raise ValueError(
+        f"Unknown array backend '{name}', expected one of {list(BACKENDS)}"
+    )
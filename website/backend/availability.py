@@ -0,0 +1,39 @@
+import numpy as np
+from backend.models import Requirement, RequirementSet, Teacher, TeacherAvailability
+
+N_DAYS = 5
+
+
+def load_teacher_availability(
+    req_set: RequirementSet, teachers: list[Teacher]
+) -> tuple[np.ndarray, dict[int, int]]:
+    """Reads the availability of ``teachers`` for ``req_set`` in one query.
+
+    Returns a ``(teachers, days)`` boolean matrix and the teacher id -> row
+    index. Teachers without a stored availability are available every day.
+    """
+    teacher_rows = {teacher.id: i for i, teacher in enumerate(teachers)}
+    availability = np.ones((len(teachers), N_DAYS), dtype=bool)
+    for teacher_id, days in TeacherAvailability.objects.filter(
+        req_set=req_set, teacher_id__in=teacher_rows
+    ).values_list("teacher_id", "availability"):
+        availability[teacher_rows[teacher_id]] = list(days.values())[:N_DAYS]
+
+    return availability, teacher_rows
+
+
+def block_teacher_incidence(
+    block_list: list[tuple[Requirement]], teacher_rows: dict[int, int]
+) -> np.ndarray:
+    incidence = np.zeros((len(block_list), len(teacher_rows)), dtype=bool)
+    for block_idx, block in enumerate(block_list):
+        incidence[block_idx, [teacher_rows[req.teacher_id] for req in block]] = True
+    return incidence
+
+
+def block_availability(
+    incidence: np.ndarray, teacher_availability: np.ndarray
+) -> np.ndarray:
+    # A block fits a day only if none of its teachers is unavailable then
+    unavailable = incidence.astype(np.int64) @ (~teacher_availability).astype(np.int64)
+    return unavailable == 0
@@ -1,4 +1,11 @@
 import numpy as np
+from django.conf import settings
+from backend.availability import (
+    block_availability,
+    block_teacher_incidence,
+    load_teacher_availability,
+)
+from backend.fitness import DEFAULT_WEIGHTS
 from backend.helpers import *
 from backend.linear_solver import solve_schedule
 from time import time
@@ -6,23 +13,19 @@ from time import time
 np.set_printoptions(precision=3, suppress=True)
 
 
-def run_evolutionary_process(generations: int, req_set_id: int):
+def run_evolutionary_process(
+    generations: int,
+    req_set_id: int,
+    selection: str = "softmax",
+    weights: dict[str, float] | None = None,
+    local_search_time: float = 0.0,
+):
     REQ_SET = RequirementSet.objects.get(id=req_set_id)
     REQUIREMENTS = Requirement.objects.filter(req_set=REQ_SET)
     VALIDATION_HOURS = list(map(lambda req: req.hours, REQUIREMENTS))
 
     TEACHERS = list(Teacher.objects.filter(pool=REQ_SET.teacher_pool))
-    TEACHER_AVAILABILITY = np.array(
-        [
-            next(
-                list(avail.availability.values())
-                for avail in TeacherAvailability.objects.filter(
-                    req_set=REQ_SET, teacher=teacher
-                )
-            )
-            for teacher in TEACHERS
-        ]
-    )
+    TEACHER_AVAILABILITY, TEACHER_ROWS = load_teacher_availability(REQ_SET, TEACHERS)
     STUDENT_GROUPS = list(StudentGroup.objects.filter(pool=REQ_SET.group_pool))
 
     print(len(REQUIREMENTS))
@@ -33,13 +36,8 @@ def run_evolutionary_process(generations: int, req_set_id: int):
     print(len(BLOCK_LIST))
     print(BLOCK_LIST)
     print(BLOCK_VAL)
-    TEACHER_AVAILABILITY = np.array(
-        [
-            np.all(
-                TEACHER_AVAILABILITY[[TEACHERS.index(b.teacher) for b in block]], axis=0
-            )
-            for block in BLOCK_LIST
-        ]
+    TEACHER_AVAILABILITY = block_availability(
+        block_teacher_incidence(BLOCK_LIST, TEACHER_ROWS), TEACHER_AVAILABILITY
     )
 
     population = initialize_population(1000, BLOCK_VAL, TEACHER_AVAILABILITY)
@@ -59,7 +57,12 @@ def run_evolutionary_process(generations: int, req_set_id: int):
         block_val=BLOCK_VAL,
         availability=TEACHER_AVAILABILITY,
         generations=generations,
-        alphas=np.array([1.0, 2.0, 1.0]),
+        selection=selection,
+        weights={**DEFAULT_WEIGHTS, **(weights or {})},
+        backend=settings.GA_BACKEND,
+        num_threads=settings.GA_NUM_THREADS,
+        mutation=settings.GA_MUTATION,
+        local_search_time=local_search_time,
     )
     print(time() - start)
 
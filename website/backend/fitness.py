@@ -0,0 +1,189 @@
+from collections.abc import Callable
+
+import numpy as np
+from backend.array_backend import NumpyBackend
+from backend.models import Requirement, StudentGroup, Subject, Teacher
+
+TARGET_DAY_HOURS = 7
+MIN_TEACHER_DAY_HOURS = 3
+MAX_SUBJECT_DAY_HOURS = 2
+
+DEFAULT_WEIGHTS = {"teacher_load": 1.0, "group_load": 2.0}
+
+# name -> function(context, population) returning a (population, entities, 5) array
+AGGREGATES: dict[str, Callable] = {}
+# name -> (entity, required aggregates, function(aggregates, context))
+FITNESS_TERMS: dict[str, tuple[str, tuple[str, ...], Callable]] = {}
+
+
+def aggregate(name: str):
+    def register(function):
+        AGGREGATES[name] = function
+        return function
+
+    return register
+
+
+def fitness_term(name: str, entity: str, requires: tuple[str, ...]):
+    def register(function):
+        FITNESS_TERMS[name] = (entity, requires, function)
+        return function
+
+    return register
+
+
+def build_fitness_context(
+    block_list: list[tuple[Requirement]],
+    teachers: list[Teacher],
+    student_groups: list[StudentGroup],
+    xp=None,
+    border_subjects: set[int] | None = None,
+) -> dict:
+    xp = xp or NumpyBackend()
+    teacher_indices = {teacher.id: i for i, teacher in enumerate(teachers)}
+    group_indices = {group.id: i for i, group in enumerate(student_groups)}
+    if border_subjects is None:
+        border_subjects = set(
+            Subject.objects.filter(
+                id__in={req.subject_id for block in block_list for req in block},
+                border=True,
+            ).values_list("id", flat=True)
+        )
+
+    subject_pairs = {}
+    for block in block_list:
+        for req in block:
+            subject_pairs.setdefault((req.group_id, req.subject_id), len(subject_pairs))
+
+    n_blocks = len(block_list)
+    teacher_incidence = np.zeros((n_blocks, len(teachers)))
+    group_incidence = np.zeros((n_blocks, len(student_groups)))
+    border_incidence = np.zeros((n_blocks, len(student_groups)))
+    subject_incidence = np.zeros((n_blocks, len(subject_pairs)))
+    subject_groups = np.zeros((len(subject_pairs), len(student_groups)))
+
+    for block_idx, block in enumerate(block_list):
+        group_idx = group_indices[block[0].group_id]
+        group_incidence[block_idx, group_idx] = 1
+        if all(req.subject_id in border_subjects for req in block):
+            border_incidence[block_idx, group_idx] = 1
+
+        for req in block:
+            teacher_incidence[block_idx, teacher_indices[req.teacher_id]] += 1
+            pair_idx = subject_pairs[(req.group_id, req.subject_id)]
+            subject_incidence[block_idx, pair_idx] = 1
+            subject_groups[pair_idx, group_indices[req.group_id]] = 1
+
+    return {
+        "xp": xp,
+        "n_teachers": len(teachers),
+        "n_groups": len(student_groups),
+        "teacher_incidence": xp.asarray(teacher_incidence, xp.float),
+        "group_incidence": xp.asarray(group_incidence, xp.float),
+        "border_incidence": xp.asarray(border_incidence, xp.float),
+        "subject_incidence": xp.asarray(subject_incidence, xp.float),
+        "subject_groups": xp.asarray(subject_groups, xp.float),
+    }
+
+
+def day_totals(context: dict, population, incidence):
+    xp = context["xp"]
+    return xp.swapaxes(xp.astype(population, xp.float) @ incidence, 1, 2)
+
+
+@aggregate("teacher_hours")
+def teacher_hours(context: dict, population: np.ndarray) -> np.ndarray:
+    return day_totals(context, population, context["teacher_incidence"])
+
+
+@aggregate("group_hours")
+def group_hours(context: dict, population: np.ndarray) -> np.ndarray:
+    return day_totals(context, population, context["group_incidence"])
+
+
+@aggregate("border_lessons")
+def border_lessons(context: dict, population: np.ndarray) -> np.ndarray:
+    return day_totals(context, population > 0, context["border_incidence"])
+
+
+@aggregate("subject_hours")
+def subject_hours(context: dict, population: np.ndarray) -> np.ndarray:
+    return day_totals(context, population, context["subject_incidence"])
+
+
+@fitness_term("teacher_load", "teacher", ("teacher_hours",))
+def teacher_load(aggregates: dict, context: dict) -> np.ndarray:
+    xp = context["xp"]
+    hours = aggregates["teacher_hours"]
+    score = (-((TARGET_DAY_HOURS - hours) ** 2) + 2) / context["n_teachers"]
+    score = xp.where(hours == 0, 0.0, score)
+    return xp.sum(score, axis=2)
+
+
+@fitness_term("group_load", "group", ("group_hours",))
+def group_load(aggregates: dict, context: dict) -> np.ndarray:
+    xp = context["xp"]
+    hours = aggregates["group_hours"]
+    score = (-((TARGET_DAY_HOURS - hours) ** 2) + 2) / context["n_groups"]
+    return xp.sum(score, axis=2)
+
+
+@fitness_term("border_subjects", "group", ("border_lessons",))
+def border_subjects(aggregates: dict, context: dict) -> np.ndarray:
+    xp = context["xp"]
+    lessons = aggregates["border_lessons"]
+    score = xp.where(
+        lessons == 0,
+        0.0,
+        xp.where(lessons == 1, 1.0, xp.where(lessons == 2, 0.5, -1.0)),
+    )
+    return xp.sum(score, axis=2) / context["n_groups"]
+
+
+@fitness_term("teacher_windows", "teacher", ("teacher_hours",))
+def teacher_windows(aggregates: dict, context: dict) -> np.ndarray:
+    # Specimens only hold day totals, so idle windows are approximated by
+    # days on which a teacher comes in for just a couple of hours
+    xp = context["xp"]
+    hours = aggregates["teacher_hours"]
+    missing = xp.clip(MIN_TEACHER_DAY_HOURS - hours, 0, None)
+    missing = xp.where(hours == 0, 0.0, missing)
+    return -xp.sum(missing, axis=2) / context["n_teachers"]
+
+
+@fitness_term("subject_day_limit", "group", ("subject_hours",))
+def subject_day_limit(aggregates: dict, context: dict) -> np.ndarray:
+    xp = context["xp"]
+    excess = xp.clip(aggregates["subject_hours"] - MAX_SUBJECT_DAY_HOURS, 0, None)
+    return -(xp.sum(excess, axis=2) @ context["subject_groups"]) / context["n_groups"]
+
+
+def evaluate_population_terms(
+    context: dict, population: np.ndarray, weights: dict[str, float]
+) -> tuple:
+    xp = context["xp"]
+    n_population = population.shape[0]
+    scores = {
+        "teacher": xp.zeros((n_population, context["n_teachers"])),
+        "group": xp.zeros((n_population, context["n_groups"])),
+    }
+
+    aggregates = {}
+    for name, weight in weights.items():
+        if not weight:
+            continue
+        entity, requires, function = FITNESS_TERMS[name]
+        for aggregate_name in requires:
+            if aggregate_name not in aggregates:
+                aggregates[aggregate_name] = AGGREGATES[aggregate_name](
+                    context, population
+                )
+        scores[entity] += weight * function(aggregates, context)
+
+    group_evaluations = scores["group"]
+    teacher_evaluations = scores["teacher"]
+    evaluations = xp.sum(group_evaluations, axis=1) + xp.sum(
+        teacher_evaluations, axis=1
+    )
+
+    return evaluations, group_evaluations, teacher_evaluations
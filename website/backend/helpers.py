@@ -4,6 +4,13 @@ import numpy as np
 from django.db.models.query import QuerySet
 from backend.models import *
 from django.db.models import Count, Q
+from backend import kernels
+from backend.array_backend import get_backend
+from backend.fitness import build_fitness_context, evaluate_population_terms
+from backend.jit_kernels import NUMBA_AVAILABLE, repair_child, resample_population
+from backend.kernels import DAY_CAPACITY, crossover_population, is_population_valid
+from backend.local_search import refine_elite
+from backend.selection import SELECTION_METHODS
 
 
 def is_array_valid(array: np.ndarray, validation_hours: np.ndarray):
@@ -657,6 +664,56 @@ def mutate_population(
     return mutated_population
 
 
+def cross_breed_jit(
+    subject1: np.ndarray,
+    subject2: np.ndarray,
+    eval1: np.ndarray,
+    eval2: np.ndarray,
+    block_val: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    # Without numba repair_child runs as plain Python, with the same
+    # invariants: block sums kept and no negative hours
+    best_day1 = np.argmax(eval1)
+    best_day2 = np.argmax(eval2)
+
+    worst_day1 = np.argmin(eval1)
+    worst_day2 = np.argmin(eval2)
+
+    child1 = subject1.copy()
+    child1[worst_day1, :] = subject2[best_day2, :]
+
+    child2 = subject2.copy()
+    child2[worst_day2, :] = subject1[best_day1, :]
+
+    repair_child(child1, best_day1, worst_day1, block_val)
+    repair_child(child2, best_day2, worst_day2, block_val)
+
+    return child1, child2
+
+
+def mutate_population_jit(
+    population: np.ndarray,
+    block_val: np.ndarray,
+    availability: np.ndarray,
+    mutation_rate: float = 0.1,
+) -> np.ndarray:
+    if not NUMBA_AVAILABLE:
+        return mutate_population(population, block_val, availability, mutation_rate)
+
+    n_population = population.shape[0]
+    n_to_mutate = int(n_population * mutation_rate)
+    if n_to_mutate == 0:
+        return population
+
+    mutate_indices = np.random.choice(n_population, n_to_mutate, replace=False)
+    mutated_population = population.copy()
+    resample_population(
+        mutated_population, mutate_indices, block_val, availability, DAY_CAPACITY
+    )
+
+    return mutated_population
+
+
 def evolutionary_loop(
     block_list: list[tuple[Requirement]],
     req_set: RequirementSet,
@@ -667,63 +724,83 @@ def evolutionary_loop(
     availability: np.ndarray,
     generations: int = 100,
     alphas=np.ones(3, dtype=np.float64),
+    selection: str = "softmax",
+    weights: dict[str, float] | None = None,
+    backend: str = "numpy",
+    num_threads: int | None = None,
+    mutation: str = "slots",
+    local_search_time: float = 0.0,
+    elite_size: int = 5,
 ):
-    group_block_indexes = np.array(
-        [student_groups.index(block[0].group) for block in block_list]
+    if weights is None:
+        weights = {"teacher_load": alphas[0], "group_load": alphas[1]}
+    xp = get_backend(backend, num_threads)
+    fitness_context = build_fitness_context(block_list, teachers, student_groups, xp)
+    select_parents = SELECTION_METHODS[selection]
+    group_block_indexes = xp.asarray(
+        [student_groups.index(block[0].group) for block in block_list], xp.int
     )
-    teacher_block_indexes = np.array(
-        [teachers.index(block[0].teacher) for block in block_list]
+    teacher_block_indexes = xp.asarray(
+        [teachers.index(block[0].teacher) for block in block_list], xp.int
     )
+    population = xp.asarray(population, xp.int)
+    block_val = xp.asarray(block_val, xp.int)
+    availability = xp.asarray(availability, xp.bool)
     population_size = population.shape[0]
+    n_pairs = population_size // 2
 
     for generation in range(generations):
 
-        evaluations, group_evaluations, teacher_evaluations = evaluate_population(
-            block_list, req_set, population, teachers, student_groups, alphas
+        evaluations, group_evaluations, teacher_evaluations = (
+            evaluate_population_terms(fitness_context, population, weights)
         )
 
-        for specimen in population:
-            assert is_array_valid(specimen, block_val)
-
-        sorted_indices = np.argsort(evaluations)[::-1]
-        population = population[sorted_indices]
-        evaluations = evaluations[sorted_indices]
-        group_evaluations = group_evaluations[sorted_indices]
-        teacher_evaluations = teacher_evaluations[sorted_indices]
-
-        print(f"Generation {generation + 1}: Best Score = {evaluations[0]}")
-
-        best_specimen = population[0]
+        assert is_population_valid(xp, population, block_val)
 
-        top_half = population[: population_size // 2]
-        top_half_eval = evaluations[: population_size // 2]
-        p = np.exp(top_half_eval) / sum(np.exp(top_half_eval))
+        scores = xp.to_numpy(evaluations)
+        best_index = np.argmax(scores)
+        print(f"Generation {generation + 1}: Best Score = {scores[best_index]}")
 
-        new_population = []
-        while len(new_population) < population_size - 1:
+        best_specimen = population[best_index]
 
-            parent_indices = np.random.choice(len(top_half), 2, replace=False, p=p)
-
-            parent1, parent2 = top_half[parent_indices]
-            eval1, eval2 = evaluations[parent_indices]
-            g_eval1, g_eval2 = group_evaluations[parent_indices]
-            t_eval1, t_eval2 = teacher_evaluations[parent_indices]
-
-            child1 = cross_breed_student_groups(
-                parent1, parent2, g_eval1, g_eval2, group_block_indexes
+        parent_pairs = xp.asarray(select_parents(scores, n_pairs), xp.int)
+        population = crossover_population(
+            xp,
+            population,
+            parent_pairs,
+            group_evaluations,
+            teacher_evaluations,
+            group_block_indexes,
+            teacher_block_indexes,
+        )
+        if mutation == "resample":
+            population = xp.asarray(
+                mutate_population_jit(
+                    xp.to_numpy(population),
+                    xp.to_numpy(block_val),
+                    xp.to_numpy(availability),
+                    0.4,
+                )
             )
-            child2 = cross_breed_teachers(
-                parent1, parent2, t_eval1, t_eval2, teacher_block_indexes
+        else:
+            population = kernels.mutate_population(
+                xp, population, block_val, availability, 0.4
             )
-            new_population.append(child1)
-            new_population.append(child2)
-
-        population = np.array(new_population)
-        population = mutate_population(population, block_val, availability, 0.4)
 
-        population = np.concatenate(
-            [population, best_specimen[np.newaxis, :, :]], axis=0
+        population = xp.concatenate([population, best_specimen[None, :, :]], axis=0)
+
+    if local_search_time > 0:
+        best_specimen = refine_elite(
+            xp,
+            fitness_context,
+            population,
+            weights,
+            block_val,
+            availability,
+            elite_size,
+            local_search_time,
         )
 
+    best_specimen = xp.to_numpy(best_specimen)
     np.save("specimen", best_specimen)
     return best_specimen
@@ -0,0 +1,39 @@
+import csv
+from collections.abc import Iterator
+from io import TextIOWrapper
+
+from openpyxl import load_workbook
+
+IMPORT_BATCH_SIZE = 2000
+
+
+def iter_csv_rows(file) -> Iterator[list[str]]:
+    # TextIOWrapper decodes the upload incrementally, chunk by chunk
+    text = TextIOWrapper(file, encoding="utf-8", newline="")
+    try:
+        yield from csv.reader(text)
+    finally:
+        text.detach()
+
+
+def cell_to_str(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def iter_xlsx_rows(file) -> Iterator[list[str]]:
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [cell_to_str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_sheet_rows(file) -> Iterator[list[str]]:
+    if file.name.lower().endswith(".xlsx"):
+        return iter_xlsx_rows(file)
+    return iter_csv_rows(file)
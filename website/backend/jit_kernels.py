@@ -0,0 +1,122 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+
+def jit(function):
+    if njit is None:
+        return function
+    return njit(cache=True)(function)
+
+
+@jit
+def sample_category(weights: np.ndarray) -> int:
+    threshold = np.random.random() * weights.sum()
+    cumulative = 0.0
+    last = -1
+    for i in range(weights.shape[0]):
+        if weights[i] <= 0:
+            continue
+        cumulative += weights[i]
+        last = i
+        if threshold < cumulative:
+            return i
+    return last
+
+
+@jit
+def repair_column(column: np.ndarray, total: int) -> None:
+    # Zeroing negative days adds hours, so the same amount is taken back from
+    # the positive days, proportionally to how many hours they hold
+    deficit = 0
+    for day in range(column.shape[0]):
+        if column[day] < 0:
+            deficit -= column[day]
+            column[day] = 0
+
+    for _ in range(deficit):
+        day = sample_category(column.astype(np.float64))
+        if day < 0:
+            break
+        column[day] -= 1
+
+    difference = total - column.sum()
+    uniform = np.ones(column.shape[0])
+    for _ in range(difference):
+        column[sample_category(uniform)] += 1
+    for _ in range(-difference):
+        column[sample_category(column.astype(np.float64))] -= 1
+
+
+@jit
+def repair_child(
+    child: np.ndarray, best_day: int, worst_day: int, block_val: np.ndarray
+) -> None:
+    for ind in range(child.shape[1]):
+        difference = child[best_day, ind] + child[worst_day, ind] - block_val[ind]
+        for _ in range(difference):
+            if np.random.random() < 0.5:
+                child[best_day, ind] -= 1
+            else:
+                child[worst_day, ind] -= 1
+
+        repair_column(child[:, ind], block_val[ind])
+
+
+@jit
+def resample_column(
+    column: np.ndarray, total: int, valid_days: np.ndarray, capacity: int
+) -> None:
+    weights = valid_days.astype(np.float64)
+    if weights.sum() == 0 or total > capacity * weights.sum():
+        weights = np.ones(column.shape[0])
+
+    column[:] = 0
+    if total <= 0:
+        return
+
+    if total == 3 and weights.sum() >= 2:
+        first = sample_category(weights)
+        weights[first] = 0
+        column[first] = 2
+        column[sample_category(weights)] = 1
+        return
+
+    for _ in range(total):
+        column[sample_category(weights)] += 1
+
+    while True:
+        excess = 0
+        for day in range(column.shape[0]):
+            if column[day] > capacity:
+                excess += column[day] - capacity
+                column[day] = capacity
+        if excess == 0:
+            break
+        for _ in range(excess):
+            column[sample_category(weights)] += 1
+
+
+@jit
+def resample_population(
+    population: np.ndarray,
+    mutate_indices: np.ndarray,
+    block_val: np.ndarray,
+    availability: np.ndarray,
+    capacity: int,
+) -> None:
+    # The capacity is an argument rather than a global, as compiled globals
+    # are frozen into the on-disk cache of this module
+    for specimen_idx in mutate_indices:
+        for block_idx in range(population.shape[2]):
+            resample_column(
+                population[specimen_idx, :, block_idx],
+                block_val[block_idx],
+                availability[block_idx],
+                capacity,
+            )
@@ -0,0 +1,85 @@
+import numpy as np
+
+DAY_CAPACITY = 2
+
+
+def is_population_valid(xp, population, block_val) -> bool:
+    return xp.all(xp.sum(population, axis=1) == block_val)
+
+
+def crossover_population(
+    xp,
+    population,
+    parent_pairs,
+    group_evaluations,
+    teacher_evaluations,
+    group_block_indexes,
+    teacher_block_indexes,
+):
+    """Vectorized ``cross_breed_student_groups`` and ``cross_breed_teachers``.
+
+    Every pair yields two children: one taking each group's blocks from the
+    parent that scored better on that group, and one doing the same per teacher.
+    """
+    parent1 = population[parent_pairs[:, 0]]
+    parent2 = population[parent_pairs[:, 1]]
+
+    group_mask = (
+        group_evaluations[parent_pairs[:, 0]] > group_evaluations[parent_pairs[:, 1]]
+    )[:, group_block_indexes]
+    teacher_mask = (
+        teacher_evaluations[parent_pairs[:, 0]]
+        > teacher_evaluations[parent_pairs[:, 1]]
+    )[:, teacher_block_indexes]
+
+    group_children = xp.where(group_mask[:, None, :], parent1, parent2)
+    teacher_children = xp.where(teacher_mask[:, None, :], parent1, parent2)
+
+    return xp.concatenate([group_children, teacher_children], axis=0)
+
+
+def sample_day_distributions(xp, block_val, availability, n_specimens: int):
+    """Spreads every block's hours over the week for ``n_specimens`` specimens.
+
+    Each day offers ``DAY_CAPACITY`` slots with random keys, unavailable days
+    are pushed behind the available ones and the ``block_val`` lowest keys are
+    taken, so no day gets more than two hours of a block. Three hour blocks
+    share one key per day, which keeps the original 2 + 1 split.
+    """
+    n_blocks, n_days = availability.shape
+
+    day_keys = xp.random((n_specimens, n_blocks, n_days, 1))
+    slot_keys = xp.random((n_specimens, n_blocks, n_days, DAY_CAPACITY))
+    three_hours = (block_val == 3)[None, :, None, None]
+    keys = xp.where(three_hours, day_keys, slot_keys)
+    keys = xp.where(availability[None, :, :, None], keys, keys + 1)
+
+    keys = keys.reshape(n_specimens, n_blocks, n_days * DAY_CAPACITY)
+    ranks = xp.argsort(xp.argsort(keys, axis=2), axis=2)
+    taken = ranks < block_val[None, :, None]
+    taken = taken.reshape(n_specimens, n_blocks, n_days, DAY_CAPACITY)
+
+    return xp.swapaxes(xp.sum(xp.astype(taken, xp.int), axis=3), 1, 2)
+
+
+def mutate_population(
+    xp,
+    population,
+    block_val,
+    availability,
+    mutation_rate: float = 0.1,
+):
+    n_population = population.shape[0]
+    n_to_mutate = int(n_population * mutation_rate)
+    if n_to_mutate == 0:
+        return population
+
+    mutate_indices = xp.asarray(
+        np.random.choice(n_population, n_to_mutate, replace=False), xp.int
+    )
+    mutated_population = xp.copy(population)
+    mutated_population[mutate_indices] = sample_day_distributions(
+        xp, block_val, availability, n_to_mutate
+    )
+
+    return mutated_population
@@ -6,7 +6,6 @@ from backend.models import (
     Teacher,
     Room,
     RequirementSet,
-    Subject,
 )
 from collections import defaultdict
 from backend.helpers import get_teacher_block_indexes, get_group_block_indexes
@@ -22,14 +21,17 @@ def solve_schedule(req_set: RequirementSet, block_list, specimen):
         block_list, Teacher.objects.filter(pool=req_set.teacher_pool)
     )
 
-    rooms = Room.objects.filter(pool=req_set.room_pool)
-    room_compatibility = {
-        subject: [room for room in rooms if subject in room.compatible_subjects.all()]
-        for subject in Subject.objects.filter(pool=req_set.subject_pool)
-    }
+    # subject id -> ids of the rooms it can be taught in, read in one query
+    room_compatibility = defaultdict(list)
+    for subject_id, room_id in (
+        Room.compatible_subjects.through.objects.filter(room__pool=req_set.room_pool)
+        .order_by("room_id")
+        .values_list("subject_id", "room_id")
+    ):
+        room_compatibility[subject_id].append(room_id)
 
     all_intervals = []
-    return_plan: list[tuple[tuple[Requirement], int, int, int]] = []
+    return_plan: list[tuple[tuple[Requirement], int, int, int, dict[int, int]]] = []
 
     for day_index, day in enumerate(specimen):
         model = cp_model.CpModel()
@@ -43,18 +45,19 @@ def solve_schedule(req_set: RequirementSet, block_list, specimen):
 
         room_assignments = defaultdict(list)
         room_intervals = defaultdict(list)
+        subject_teachers = {}
 
         for block, duration in zip(block_list, day):
             if duration == 0:
                 task_intervals.append(None)
                 all_intervals.append(None)
             else:
-                start_var = model.NewIntVar(
-                    0, horizon, f"{tuple(map(str, block))}_start"
-                )
-                end_var = model.NewIntVar(0, horizon, f"{tuple(map(str, block))}_end")
+                # Named by requirement ids, str(req) would query its relations
+                block_name = tuple(req.id for req in block)
+                start_var = model.NewIntVar(0, horizon, f"{block_name}_start")
+                end_var = model.NewIntVar(0, horizon, f"{block_name}_end")
                 interval_var = model.NewIntervalVar(
-                    start_var, duration, end_var, f"{tuple(map(str, block))}_interval"
+                    start_var, duration, end_var, f"{block_name}_interval"
                 )
 
                 task_starts[interval_var] = start_var
@@ -64,32 +67,33 @@ def solve_schedule(req_set: RequirementSet, block_list, specimen):
 
                 rooms_dict = defaultdict(set)
                 for req in block:
-                    rooms_dict[req.subject].add(req.teacher)
+                    rooms_dict[req.subject_id].add(req.teacher_id)
 
                 block_room_assignments = []
-                for subject, teachers in rooms_dict.items():
+                for subject_id, teachers in rooms_dict.items():
                     room_present_vars = []
-                    for room in room_compatibility[subject]:
+                    for room_id in room_compatibility[subject_id]:
                         room_present_var = model.NewBoolVar(
-                            f"room_present_{room.id}_{tuple(map(str, block))}"
+                            f"room_present_{room_id}_{block_name}"
                         )
                         room_interval_var = model.NewOptionalIntervalVar(
                             start_var,
                             duration,
                             end_var,
                             room_present_var,
-                            f"room_interval_{room.id}_{tuple(map(str, block))}",
+                            f"room_interval_{room_id}_{block_name}",
                         )
 
                         room_present_vars.append(room_present_var)
-                        room_intervals[room.id].append(room_interval_var)
+                        room_intervals[room_id].append(room_interval_var)
                         block_room_assignments.append(
-                            (room.id, room_present_var, room_interval_var)
+                            (subject_id, room_id, room_present_var)
                         )
 
                     model.Add(sum(room_present_vars) == len(teachers))
 
                 room_assignments[interval_var] = block_room_assignments
+                subject_teachers[interval_var] = rooms_dict
                 task_intervals.append(interval_var)
                 all_intervals.append(interval_var)
 
@@ -146,12 +150,19 @@ def solve_schedule(req_set: RequirementSet, block_list, specimen):
 
             for interval in task_intervals:
                 if interval:
-                    assigned_rooms = []
-                    for room_id, present_var, room_interval in room_assignments[
-                        interval
-                    ]:
+                    assigned_rooms = defaultdict(list)
+                    for subject_id, room_id, present_var in room_assignments[interval]:
                         if solver.BooleanValue(present_var):
-                            assigned_rooms.append(room_id)
+                            assigned_rooms[subject_id].append(room_id)
+
+                    # Every subject got one room per teacher, a teacher with
+                    # several subjects in the block keeps the first one
+                    room_by_teacher = {}
+                    for subject_id, teachers in subject_teachers[interval].items():
+                        for teacher_id, room_id in zip(
+                            sorted(teachers), assigned_rooms[subject_id]
+                        ):
+                            room_by_teacher.setdefault(teacher_id, room_id)
 
                     return_plan.append(
                         (
@@ -159,7 +170,7 @@ def solve_schedule(req_set: RequirementSet, block_list, specimen):
                             solver.Value(interval.StartExpr()),
                             solver.Value(interval.EndExpr()),
                             day_index,
-                            assigned_rooms,
+                            room_by_teacher,
                         )
                     )
         else:
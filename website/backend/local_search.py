@@ -0,0 +1,198 @@
+from time import perf_counter
+
+import numpy as np
+from backend.fitness import (
+    MAX_SUBJECT_DAY_HOURS,
+    MIN_TEACHER_DAY_HOURS,
+    TARGET_DAY_HOURS,
+    evaluate_population_terms,
+)
+from backend.kernels import DAY_CAPACITY
+from backend.selection import top_k_indices
+
+
+def load_score(hours: float) -> float:
+    return -((TARGET_DAY_HOURS - hours) ** 2) + 2
+
+
+def teacher_day_score(hours: float, weights: dict[str, float], n_teachers: int):
+    if hours == 0:
+        return 0.0
+    score = weights.get("teacher_load", 0.0) * load_score(hours)
+    score -= weights.get("teacher_windows", 0.0) * max(0, MIN_TEACHER_DAY_HOURS - hours)
+    return score / n_teachers
+
+
+def group_day_score(hours: float, weights: dict[str, float], n_groups: int):
+    return weights.get("group_load", 0.0) * load_score(hours) / n_groups
+
+
+def border_day_score(lessons: float, weights: dict[str, float], n_groups: int):
+    score = {0: 0.0, 1: 1.0, 2: 0.5}.get(lessons, -1.0)
+    return weights.get("border_subjects", 0.0) * score / n_groups
+
+
+def subject_day_score(hours: float, weights: dict[str, float], n_groups: int):
+    excess = max(0, hours - MAX_SUBJECT_DAY_HOURS)
+    return -weights.get("subject_day_limit", 0.0) * excess / n_groups
+
+
+def day_swap_local_search(
+    specimen: np.ndarray,
+    block_val: np.ndarray,
+    availability: np.ndarray,
+    teacher_incidence: np.ndarray,
+    group_incidence: np.ndarray,
+    border_incidence: np.ndarray,
+    subject_incidence: np.ndarray,
+    weights: dict[str, float],
+    time_budget: float,
+) -> np.ndarray:
+    """Greedy hill climbing that moves single hours of a block between days.
+
+    Only the day totals touched by a move are rescored, so each candidate
+    move costs O(teachers and subjects in the block). The delta covers every
+    term of ``FITNESS_TERMS``.
+    """
+    specimen = specimen.copy()
+    n_days, n_blocks = specimen.shape
+    n_teachers = teacher_incidence.shape[1]
+    n_groups = group_incidence.shape[1]
+
+    teacher_hours = (specimen @ teacher_incidence).T
+    group_hours = (specimen @ group_incidence).T
+    border_lessons = ((specimen > 0) @ border_incidence).T
+    subject_hours = (specimen @ subject_incidence).T
+    block_teachers = [np.nonzero(row)[0] for row in teacher_incidence]
+    block_groups = [np.nonzero(row)[0] for row in group_incidence]
+    block_border_groups = [np.nonzero(row)[0] for row in border_incidence]
+    block_subjects = [np.nonzero(row)[0] for row in subject_incidence]
+
+    def move_delta(block: int, source: int, target: int) -> float:
+        delta = 0.0
+        for teacher in block_teachers[block]:
+            count = teacher_incidence[block, teacher]
+            hours = teacher_hours[teacher]
+            delta += (
+                teacher_day_score(hours[source] - count, weights, n_teachers)
+                + teacher_day_score(hours[target] + count, weights, n_teachers)
+                - teacher_day_score(hours[source], weights, n_teachers)
+                - teacher_day_score(hours[target], weights, n_teachers)
+            )
+        for group in block_groups[block]:
+            count = group_incidence[block, group]
+            hours = group_hours[group]
+            delta += (
+                group_day_score(hours[source] - count, weights, n_groups)
+                + group_day_score(hours[target] + count, weights, n_groups)
+                - group_day_score(hours[source], weights, n_groups)
+                - group_day_score(hours[target], weights, n_groups)
+            )
+        # A border lesson counts once per day, however many hours it has
+        emptied = specimen[source, block] == 1
+        filled = specimen[target, block] == 0
+        for group in block_border_groups[block]:
+            lessons = border_lessons[group]
+            delta += (
+                border_day_score(lessons[source] - emptied, weights, n_groups)
+                + border_day_score(lessons[target] + filled, weights, n_groups)
+                - border_day_score(lessons[source], weights, n_groups)
+                - border_day_score(lessons[target], weights, n_groups)
+            )
+        for subject in block_subjects[block]:
+            count = subject_incidence[block, subject]
+            hours = subject_hours[subject]
+            delta += (
+                subject_day_score(hours[source] - count, weights, n_groups)
+                + subject_day_score(hours[target] + count, weights, n_groups)
+                - subject_day_score(hours[source], weights, n_groups)
+                - subject_day_score(hours[target], weights, n_groups)
+            )
+        return delta
+
+    def apply_move(block: int, source: int, target: int) -> None:
+        if specimen[source, block] == 1:
+            border_lessons[:, source] -= border_incidence[block]
+        if specimen[target, block] == 0:
+            border_lessons[:, target] += border_incidence[block]
+        specimen[source, block] -= 1
+        specimen[target, block] += 1
+        teacher_hours[:, source] -= teacher_incidence[block]
+        teacher_hours[:, target] += teacher_incidence[block]
+        group_hours[:, source] -= group_incidence[block]
+        group_hours[:, target] += group_incidence[block]
+        subject_hours[:, source] -= subject_incidence[block]
+        subject_hours[:, target] += subject_incidence[block]
+
+    deadline = perf_counter() + time_budget
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = False
+        for block in np.random.permutation(n_blocks):
+            for source in range(n_days):
+                if specimen[source, block] == 0:
+                    continue
+                for target in np.random.permutation(n_days):
+                    if (
+                        target == source
+                        or not availability[block, target]
+                        or specimen[target, block] >= DAY_CAPACITY
+                    ):
+                        continue
+                    # Three hour blocks keep their 2 + 1 split
+                    if (
+                        block_val[block] == 3
+                        and specimen[source, block] == 2
+                        and specimen[target, block] == 0
+                    ):
+                        continue
+                    if move_delta(block, source, target) > 1e-9:
+                        apply_move(block, source, target)
+                        improved = True
+                        break
+            if perf_counter() >= deadline:
+                break
+
+    return specimen
+
+
+def refine_elite(
+    xp,
+    fitness_context: dict,
+    population,
+    weights: dict[str, float],
+    block_val,
+    availability,
+    elite_size: int,
+    time_budget: float,
+):
+    evaluations, _, _ = evaluate_population_terms(fitness_context, population, weights)
+    elite = population[xp.asarray(top_k_indices(xp.to_numpy(evaluations), elite_size))]
+
+    teacher_incidence = xp.to_numpy(fitness_context["teacher_incidence"])
+    group_incidence = xp.to_numpy(fitness_context["group_incidence"])
+    border_incidence = xp.to_numpy(fitness_context["border_incidence"])
+    subject_incidence = xp.to_numpy(fitness_context["subject_incidence"])
+    refined = np.stack(
+        [
+            day_swap_local_search(
+                xp.to_numpy(specimen),
+                xp.to_numpy(block_val),
+                xp.to_numpy(availability),
+                teacher_incidence,
+                group_incidence,
+                border_incidence,
+                subject_incidence,
+                weights,
+                time_budget / elite.shape[0],
+            )
+            for specimen in elite
+        ]
+    )
+
+    candidates = xp.concatenate([elite, xp.asarray(refined)], axis=0)
+    evaluations, _, _ = evaluate_population_terms(fitness_context, candidates, weights)
+    best_index = np.argmax(xp.to_numpy(evaluations))
+    print(f"Local search: Best Score = {xp.to_numpy(evaluations)[best_index]}")
+
+    return candidates[best_index]
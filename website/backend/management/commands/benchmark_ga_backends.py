@@ -0,0 +1,105 @@
+from time import perf_counter
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from backend.array_backend import get_backend
+from backend.fitness import FITNESS_TERMS, build_fitness_context
+from backend.fitness import evaluate_population_terms
+from backend.helpers import initialize_population
+from backend.kernels import crossover_population, mutate_population
+from backend.selection import softmax_selection
+
+
+def synthetic_problem(n_blocks: int, n_teachers: int, n_groups: int):
+    teachers = [SimpleNamespace(id=i) for i in range(n_teachers)]
+    student_groups = [SimpleNamespace(id=i) for i in range(n_groups)]
+    block_list = [
+        (
+            SimpleNamespace(
+                teacher_id=np.random.randint(n_teachers),
+                group_id=np.random.randint(n_groups),
+                subject_id=np.random.randint(20),
+            ),
+        )
+        for _ in range(n_blocks)
+    ]
+    block_val = np.random.randint(1, 5, size=n_blocks)
+    availability = np.ones((n_blocks, 5), dtype=bool)
+    return block_list, teachers, student_groups, block_val, availability
+
+
+class Command(BaseCommand):
+    help = "Compares the NumPy and torch CPU backends on the GA population kernels"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--population", type=int, default=1000)
+        parser.add_argument("--blocks", type=int, default=400)
+        parser.add_argument("--teachers", type=int, default=60)
+        parser.add_argument("--groups", type=int, default=30)
+        parser.add_argument("--generations", type=int, default=20)
+        parser.add_argument("--threads", type=int, nargs="*", default=[1])
+
+    def handle(self, *args, **options):
+        np.random.seed(0)
+        block_list, teachers, student_groups, block_val, availability = (
+            synthetic_problem(options["blocks"], options["teachers"], options["groups"])
+        )
+        population = initialize_population(
+            options["population"], block_val, availability
+        )
+        weights = {name: 1.0 for name in FITNESS_TERMS}
+
+        runs = [("numpy", None)] + [("torch", n) for n in options["threads"]]
+        for backend, num_threads in runs:
+            try:
+                xp = get_backend(backend, num_threads)
+            except ImportError as e:
+                self.stdout.write(f"{backend:>6}: skipped ({e})")
+                continue
+
+            context = build_fitness_context(
+                block_list, teachers, student_groups, xp, border_subjects=set()
+            )
+            pop = xp.asarray(population, xp.int)
+            val = xp.asarray(block_val, xp.int)
+            aval = xp.asarray(availability, xp.bool)
+            group_indexes = xp.asarray([b[0].group_id for b in block_list], xp.int)
+            teacher_indexes = xp.asarray([b[0].teacher_id for b in block_list], xp.int)
+
+            timings = {"fitness": 0.0, "crossover": 0.0, "mutation": 0.0}
+            for _ in range(options["generations"]):
+                start = perf_counter()
+                evaluations, group_eval, teacher_eval = evaluate_population_terms(
+                    context, pop, weights
+                )
+                scores = xp.to_numpy(evaluations)
+                timings["fitness"] += perf_counter() - start
+
+                pairs = xp.asarray(softmax_selection(scores, pop.shape[0] // 2), xp.int)
+                start = perf_counter()
+                pop = crossover_population(
+                    xp,
+                    pop,
+                    pairs,
+                    group_eval,
+                    teacher_eval,
+                    group_indexes,
+                    teacher_indexes,
+                )
+                timings["crossover"] += perf_counter() - start
+
+                start = perf_counter()
+                pop = mutate_population(xp, pop, val, aval, 0.4)
+                timings["mutation"] += perf_counter() - start
+
+            per_generation = {
+                k: 1000 * v / options["generations"] for k, v in timings.items()
+            }
+            label = backend if num_threads is None else f"{backend}/{num_threads}t"
+            self.stdout.write(
+                f"{label:>10}: "
+                + ", ".join(f"{k} {v:.1f} ms" for k, v in per_generation.items())
+                + f", total {sum(per_generation.values()):.1f} ms/generation"
+            )
@@ -0,0 +1,104 @@
+from time import perf_counter
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.helpers import (
+    cross_breed,
+    cross_breed_jit,
+    initialize_population,
+    mutate_population,
+    mutate_population_jit,
+)
+from backend.jit_kernels import NUMBA_AVAILABLE
+from backend.kernels import DAY_CAPACITY
+
+
+def random_problem(n_blocks: int):
+    block_val = np.random.randint(1, 6, size=n_blocks)
+    availability = np.ones((n_blocks, 5), dtype=bool)
+    for block_idx, total in enumerate(block_val):
+        n_closed = np.random.randint(0, 5 - (total + 1) // DAY_CAPACITY)
+        closed = np.random.choice(5, n_closed, replace=False)
+        availability[block_idx, closed] = False
+    return block_val, availability
+
+
+def crossover_violations(children, block_val) -> dict[str, int]:
+    children = np.array(children)
+    return {
+        "wrong block sums": int((children.sum(axis=1) != block_val).sum()),
+        "negative hours": int((children < 0).sum()),
+    }
+
+
+def mutation_violations(population, block_val, availability) -> dict[str, int]:
+    return {
+        "wrong block sums": int((population.sum(axis=1) != block_val).sum()),
+        "over day capacity": int((population > DAY_CAPACITY).sum()),
+        "unavailable days": int(
+            (population * ~availability.T[np.newaxis, :, :]).astype(bool).sum()
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks that the numba crossover repair and mutation kernels keep the "
+        "same invariants as the Python implementations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--population", type=int, default=200)
+        parser.add_argument("--blocks", type=int, default=300)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        np.random.seed(options["seed"])
+        self.stdout.write(f"numba available: {NUMBA_AVAILABLE}")
+
+        block_val, availability = random_problem(options["blocks"])
+        population = initialize_population(
+            options["population"], block_val, availability
+        )
+        evaluations = np.random.random((options["population"], 5))
+        pairs = np.random.randint(0, options["population"], size=(100, 2))
+
+        # First call compiles the kernels, keep it out of the timings
+        cross_breed_jit(*population[:2], *evaluations[:2], block_val)
+        mutate_population_jit(population[:2], block_val, availability, 1.0)
+
+        failed = False
+        for name, function in (("python", cross_breed), ("jit", cross_breed_jit)):
+            start = perf_counter()
+            children = []
+            for i, j in pairs:
+                children.extend(
+                    function(
+                        population[i],
+                        population[j],
+                        evaluations[i],
+                        evaluations[j],
+                        block_val,
+                    )
+                )
+            elapsed = perf_counter() - start
+            violations = crossover_violations(children, block_val)
+            self.stdout.write(f"cross_breed {name:>6}: {elapsed:.3f}s {violations}")
+            failed |= violations["wrong block sums"] > 0
+            # The original cross_breed may leave negative hours, the repair may not
+            failed |= name == "jit" and violations["negative hours"] > 0
+
+        for name, function in (
+            ("python", mutate_population),
+            ("jit", mutate_population_jit),
+        ):
+            start = perf_counter()
+            mutated = function(population, block_val, availability, 1.0)
+            elapsed = perf_counter() - start
+            violations = mutation_violations(mutated, block_val, availability)
+            self.stdout.write(f"mutation    {name:>6}: {elapsed:.3f}s {violations}")
+            failed |= any(violations.values())
+
+        if failed:
+            raise CommandError("GA kernels broke the population invariants")
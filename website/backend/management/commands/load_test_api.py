@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+
+DEFAULT_PATHS = [
+    "/api/teacher-pools/",
+    "/api/subject-pools/",
+    "/api/student-group-pools/",
+    "/api/teachers/",
+    "/api/subjects/",
+    "/api/student-groups/",
+]
+
+
+def discard_start_response(status, headers, exc_info=None):
+    return lambda data: None
+
+
+def timed_requests(handler, environs: list[dict]) -> list[float]:
+    """Sends ``environs`` through the full WSGI request cycle of this thread.
+
+    ``request_finished`` fires after every response, so connections older
+    than ``CONN_MAX_AGE`` are closed exactly as under a real server.
+    """
+    latencies = []
+    try:
+        for environ in environs:
+            start = perf_counter()
+            response = handler(dict(environ), discard_start_response)
+            b"".join(response)
+            response.close()
+            latencies.append(perf_counter() - start)
+    finally:
+        connections.close_all()
+    return latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures API latency through the WSGI handler with different "
+        "CONN_MAX_AGE values, or with the connection pool when DATABASE_POOL=1"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--conn-max-age", type=int, nargs="*", default=[0, 60])
+        parser.add_argument("--paths", nargs="*", default=DEFAULT_PATHS)
+        parser.add_argument("--username", help="Defaults to the first active user")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(is_active=True)
+        if options["username"]:
+            users = users.filter(username=options["username"])
+        user = users.first()
+        if user is None:
+            raise CommandError("An active user is needed to call the API")
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        factory = RequestFactory(HTTP_COOKIE=cookie)
+        paths = options["paths"]
+        environs = [
+            factory.get(paths[i % len(paths)]).environ
+            for i in range(options["requests"])
+        ]
+        chunks = np.array_split(np.arange(len(environs)), options["concurrency"])
+
+        db_settings = connections.settings["default"]
+        if "pool" in db_settings.get("OPTIONS", {}):
+            runs = [("pool", None)]
+        else:
+            runs = [(f"CONN_MAX_AGE={age}", age) for age in options["conn_max_age"]]
+
+        handler = WSGIHandler()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for label, conn_max_age in runs:
+                if conn_max_age is not None:
+                    db_settings["CONN_MAX_AGE"] = conn_max_age
+                connections.close_all()
+
+                start = perf_counter()
+                with ThreadPoolExecutor(options["concurrency"]) as executor:
+                    results = executor.map(
+                        lambda chunk: timed_requests(
+                            handler, [environs[i] for i in chunk]
+                        ),
+                        chunks,
+                    )
+                    latencies = 1000 * np.array([t for r in results for t in r])
+                elapsed = perf_counter() - start
+
+                self.stdout.write(
+                    f"{label:>16}: p50 {np.percentile(latencies, 50):.2f} ms, "
+                    f"p95 {np.percentile(latencies, 95):.2f} ms, "
+                    f"{len(latencies) / elapsed:.0f} requests/s"
+                )
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.11 on 2026-10-19 17:56
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    # Lookups used to pick the oldest row of a key, so that one is kept
+    for model_name, fields in (
+        ("Requirement", ("req_set", "subject", "teacher", "group")),
+        ("TeacherAvailability", ("req_set", "teacher")),
+    ):
+        model = apps.get_model("backend", model_name)
+        rows = model.objects.filter(req_set__isnull=False)
+        keep = rows.values(*fields).annotate(keep_id=Min("id")).values("keep_id")
+        rows.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("backend", "0013_remove_room_preferences_room_compatible_subjects"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["plan", "day", "hour"], name="lesson_plan_day_hour_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="requirement",
+            constraint=models.UniqueConstraint(
+                fields=("req_set", "subject", "teacher", "group"),
+                name="unique_requirement",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="teacheravailability",
+            constraint=models.UniqueConstraint(
+                fields=("req_set", "teacher"), name="unique_teacher_availability"
+            ),
+        ),
+    ]
@@ -97,6 +97,13 @@ class TeacherAvailability(models.Model):
     req_set = models.ForeignKey(RequirementSet, on_delete=models.SET_NULL, null=True)
     availability = models.JSONField()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["req_set", "teacher"], name="unique_teacher_availability"
+            )
+        ]
+
     def __str__(self):
         return f"Availability of {self.teacher} for {self.req_set}"
 
@@ -110,6 +117,15 @@ class Requirement(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     hours = models.PositiveIntegerField()
 
+    class Meta:
+        # Also serves lookups by req_set alone, as its leading column
+        constraints = [
+            models.UniqueConstraint(
+                fields=["req_set", "subject", "teacher", "group"],
+                name="unique_requirement",
+            )
+        ]
+
     def __str__(self):
         return f"{self.subject} {self.hours}h - {self.teacher} / {self.group}"
 
@@ -131,5 +147,12 @@ class Lesson(models.Model):
     day = models.PositiveSmallIntegerField()
     hour = models.PositiveSmallIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["plan", "day", "hour"], name="lesson_plan_day_hour_idx"
+            )
+        ]
+
     def __str__(self):
         return f"{self.subject} by {self.teacher} in {self.room} (Day {self.day}, Hour {self.hour})"
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+def top_k_indices(evaluations: np.ndarray, k: int) -> np.ndarray:
+    k = max(1, min(k, evaluations.shape[0]))
+    return np.argpartition(evaluations, -k)[-k:]
+
+
+def softmax_probabilities(
+    evaluations: np.ndarray, temperature: float = 1.0
+) -> np.ndarray:
+    # Shifting by the max keeps exp() in (0, 1], so large scores cannot overflow
+    weights = np.exp((evaluations - evaluations.max()) / temperature)
+    return weights / weights.sum()
+
+
+def sample_pairs(probabilities: np.ndarray, n_pairs: int) -> np.ndarray:
+    """Draws ``n_pairs`` pairs of distinct indices in one go.
+
+    The second index of every pair is sampled from the same distribution with
+    the first one removed, which matches ``np.random.choice(..., 2,
+    replace=False, p=probabilities)`` without a Python call per pair.
+    """
+    n = probabilities.shape[0]
+    cumulative = np.cumsum(probabilities)
+    cumulative /= cumulative[-1]
+
+    first = np.searchsorted(cumulative, np.random.random(n_pairs), side="right")
+    first = np.minimum(first, n - 1)
+    if n == 1:
+        return np.stack([first, first], axis=1)
+
+    p_first = probabilities[first] / probabilities.sum()
+    before_first = cumulative[first] - p_first
+    u = np.random.random(n_pairs) * (1 - p_first)
+    u = np.where(u < before_first, u, u + p_first)
+
+    second = np.searchsorted(cumulative, u, side="right")
+    second = np.minimum(second, n - 1)
+
+    # Only reachable when the whole mass sits on ``first``
+    collision = second == first
+    second[collision] = (first[collision] + 1) % n
+
+    return np.stack([first, second], axis=1)
+
+
+def truncation_selection(
+    evaluations: np.ndarray, n_pairs: int, ratio: float = 0.5
+) -> np.ndarray:
+    candidates = top_k_indices(evaluations, int(evaluations.shape[0] * ratio))
+    probabilities = np.full(candidates.shape[0], 1 / candidates.shape[0])
+    return candidates[sample_pairs(probabilities, n_pairs)]
+
+
+def softmax_selection(
+    evaluations: np.ndarray,
+    n_pairs: int,
+    ratio: float = 0.5,
+    temperature: float = 1.0,
+) -> np.ndarray:
+    candidates = top_k_indices(evaluations, int(evaluations.shape[0] * ratio))
+    probabilities = softmax_probabilities(evaluations[candidates], temperature)
+    return candidates[sample_pairs(probabilities, n_pairs)]
+
+
+def tournament_selection(
+    evaluations: np.ndarray, n_pairs: int, tournament_size: int = 3
+) -> np.ndarray:
+    contestants = np.random.randint(
+        0, evaluations.shape[0], size=(n_pairs, 2, tournament_size)
+    )
+    winners = np.argmax(evaluations[contestants], axis=2)
+    return np.take_along_axis(contestants, winners[:, :, np.newaxis], axis=2)[:, :, 0]
+
+
+SELECTION_METHODS = {
+    "softmax": softmax_selection,
+    "truncation": truncation_selection,
+    "tournament": tournament_selection,
+}
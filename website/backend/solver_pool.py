@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+
+executor = None
+
+
+def init_solver_process(niceness: int) -> None:
+    # Lower priority, so API workers keep the CPU while a plan is computed
+    os.nice(niceness)
+    django.setup()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global executor
+    if executor is None:
+        # spawn, as forked children would share the parent's DB connections
+        executor = ProcessPoolExecutor(
+            max_workers=settings.SOLVER_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_solver_process,
+            initargs=(settings.SOLVER_NICE,),
+        )
+    return executor
+
+
+def discard_executor(broken: ProcessPoolExecutor) -> None:
+    global executor
+    # Another thread may already have replaced the broken pool
+    if executor is broken:
+        executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def run_in_solver_process(function, *args):
+    """Runs ``function(*args)`` in the solver process pool and waits for it.
+
+    The GA and CP-SAT hold the CPU (and the GIL) for minutes, running them in
+    a separate process keeps the other threads of the serving worker
+    responsive. With ``SOLVER_PROCESSES = 0`` the call runs inline.
+
+    A pool stays broken once one of its processes dies (e.g. OOM-killed), so
+    it is replaced and the call retried once. If the fresh pool breaks as
+    well, ``BrokenProcessPool`` propagates.
+    """
+    if settings.SOLVER_PROCESSES == 0:
+        return function(*args)
+
+    for attempt in range(2):
+        pool = get_executor()
+        try:
+            return pool.submit(function, *args).result()
+        except BrokenProcessPool:
+            discard_executor(pool)
+            if attempt == 1:
+                raise
@@ -1,9 +1,17 @@
-import csv
+import hashlib
+import json
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from io import StringIO
+from zipfile import BadZipFile
 
+from django.db import transaction
+from django.db.models import Prefetch
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from openpyxl.utils.exceptions import InvalidFileException
 from rest_framework import status
 from rest_framework.decorators import action, api_view, parser_classes
 from rest_framework.parsers import MultiPartParser
@@ -11,40 +19,127 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from .evolutionary import run_evolutionary_process
+from .fitness import FITNESS_TERMS
+from .importers import IMPORT_BATCH_SIZE, iter_sheet_rows
 from .models import *
 from .models import Requirement, RequirementSet, StudentGroup, Subject, Teacher
+from .selection import SELECTION_METHODS
 from .serializers import *
 from .serializers import RequirementSerializer
-
-
+from .solver_pool import run_in_solver_process
+
+LESSON_COLUMNS = (
+    "id",
+    "day",
+    "hour",
+    "teacher_id",
+    "teacher__name",
+    "subject_id",
+    "subject__name",
+    "room_id",
+    "room__name",
+    "student_group_id",
+    "student_group__name",
+)
+LESSON_REFERENCES = ("teacher", "subject", "room", "group")
+# Plans are per user and can be deleted or regenerated: only the browser
+# caches them, briefly, and revalidates with the ETag afterwards
+PLAN_CACHE_CONTROL = "private, max-age=300"
+
+
+def columnar_lessons(rows) -> dict:
+    """Lookup tables of the referenced objects plus one integer column per field.
+
+    ``teacher``, ``subject``, ``room`` and ``group`` columns hold indexes into
+    the matching lookup table instead of ids.
+    """
+    lookups = {name: {"id": [], "name": []} for name in LESSON_REFERENCES}
+    indexes = {name: {} for name in LESSON_REFERENCES}
+    columns = {name: [] for name in ("id", "day", "hour", *LESSON_REFERENCES)}
+
+    for lesson_id, day, hour, *references in rows:
+        columns["id"].append(lesson_id)
+        columns["day"].append(day)
+        columns["hour"].append(hour)
+        for name, ref_id, ref_name in zip(
+            LESSON_REFERENCES, references[::2], references[1::2]
+        ):
+            index = indexes[name].get(ref_id)
+            if index is None:
+                index = indexes[name][ref_id] = len(lookups[name]["id"])
+                lookups[name]["id"].append(ref_id)
+                lookups[name]["name"].append(ref_name)
+            columns[name].append(index)
+
+    return {**lookups, "lessons": columns}
+
+
+@gzip_page
 @api_view(["GET"])
 def get_lessons_for_plan(request, plan_id):
+    """Lessons of a plan, optionally narrowed with ``?group=<id>`` or ``?teacher=<id>``.
+
+    ``?layout=compact`` returns the payload built by ``columnar_lessons``.
+    """
+    try:
+        filters = {
+            f"{field}_id": int(request.query_params[param])
+            for param, field in (("group", "student_group"), ("teacher", "teacher"))
+            if param in request.query_params
+        }
+    except ValueError:
+        return JsonResponse({"error": "group and teacher must be ids"}, status=400)
+
     try:
         plan = Plan.objects.get(id=plan_id)
-        lessons = Lesson.objects.filter(plan=plan).select_related(
-            "teacher", "subject", "room", "plan", "student_group"
+        rows = (
+            Lesson.objects.filter(plan=plan, **filters)
+            .order_by("day", "hour", "id")
+            .values_list(*LESSON_COLUMNS)
         )
-        data = [
-            {
-                "id": lesson.id,
-                "teacher": {"id": lesson.teacher.id, "name": lesson.teacher.name},
-                "subject": {"id": lesson.subject.id, "name": lesson.subject.name},
-                "room": {"id": lesson.room.id, "name": lesson.room.name},
-                "day": lesson.day,
-                "hour": lesson.hour,
-                "group": {
-                    "id": lesson.student_group.id,
-                    "name": lesson.student_group.name,
-                },
-            }
-            for lesson in lessons
-        ]
-        return JsonResponse(data, safe=False, status=200)
+        if request.query_params.get("layout") == "compact":
+            data = {"plan": plan.id, **columnar_lessons(rows)}
+        else:
+            data = [
+                {
+                    "id": lesson_id,
+                    "teacher": {"id": teacher_id, "name": teacher_name},
+                    "subject": {"id": subject_id, "name": subject_name},
+                    "room": {"id": room_id, "name": room_name},
+                    "day": day,
+                    "hour": hour,
+                    "group": {"id": group_id, "name": group_name},
+                }
+                for (
+                    lesson_id,
+                    day,
+                    hour,
+                    teacher_id,
+                    teacher_name,
+                    subject_id,
+                    subject_name,
+                    room_id,
+                    room_name,
+                    group_id,
+                    group_name,
+                ) in rows
+            ]
+        response = JsonResponse(data, safe=False, status=200)
     except Plan.DoesNotExist:
         return JsonResponse({"error": "Plan not found"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified["Cache-Control"] = PLAN_CACHE_CONTROL
+        return not_modified
+
+    response["ETag"] = etag
+    response["Cache-Control"] = PLAN_CACHE_CONTROL
+    return response
+
 
 @api_view(["GET"])
 def get_plan_details(request, plan_id):
@@ -75,8 +170,35 @@ def get_plan_details(request, plan_id):
         return JsonResponse({"error": str(e)}, status=500)
 
 
+def upsert_requirements(
+    req_set: RequirementSet, hours_by_key: dict[tuple[int, int, int], int]
+) -> None:
+    """Writes ``(subject_id, teacher_id, group_id) -> hours`` for ``req_set``.
+
+    Relies on the ``unique_requirement`` constraint: rows are sent as batched
+    ``INSERT ... ON CONFLICT DO UPDATE`` statements, without reading them first.
+    """
+    Requirement.objects.bulk_create(
+        (
+            Requirement(
+                req_set=req_set,
+                subject_id=subject_id,
+                teacher_id=teacher_id,
+                group_id=group_id,
+                hours=hours,
+            )
+            for (subject_id, teacher_id, group_id), hours in hours_by_key.items()
+        ),
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["req_set", "subject", "teacher", "group"],
+        update_fields=["hours"],
+    )
+
+
 @api_view(["POST"])
 @parser_classes([MultiPartParser])
+@transaction.atomic
 def import_requirements_csv(request):
     file = request.FILES.get("file")
     teacher_pool_id = request.data.get("teacher_pool_id")
@@ -121,16 +243,19 @@ def import_requirements_csv(request):
             room_pool=None,
         )
 
-    csv_text = file.read().decode("utf-8")
-    reader = csv.reader(StringIO(csv_text))
+    reader = iter_sheet_rows(file)
 
     try:
         first_row = next(reader)
         second_row = next(reader)
     except StopIteration:
+        transaction.set_rollback(True)
         return Response(
             {"error": "CSV must contain at least two header rows"}, status=400
         )
+    except (UnicodeDecodeError, InvalidFileException, BadZipFile):
+        transaction.set_rollback(True)
+        return Response({"error": "File is not a UTF-8 CSV or XLSX sheet"}, status=400)
 
     raw_first = first_row[1:]
     raw_second = second_row[1:]
@@ -154,55 +279,52 @@ def import_requirements_csv(request):
     current_subject = None
     processed_rows = 0
     upserted = 0
+    hours_by_key = {}
 
-    for row in reader:
-        if not row:
-            continue
-        label = (row[0] or "").strip()
-        if not label or is_numeric(label):
-            continue
-
-        if label in subjects_cache:
-            current_subject = subjects_cache[label]
-            processed_rows += 1
-            continue
-
-        if label in teachers_cache and current_subject:
-            teacher = teachers_cache[label]
+    # Rows are decoded lazily, so a bad byte can surface anywhere in the loop.
+    # An error response does not roll back the atomic block by itself, which
+    # would keep a new set and the batches already upserted into it.
+    try:
+        for row in reader:
+            if not row:
+                continue
+            label = (row[0] or "").strip()
+            if not label or is_numeric(label):
+                continue
 
-            hours_cells = row[1:]
+            if label in subjects_cache:
+                current_subject = subjects_cache[label]
+                processed_rows += 1
+                continue
 
-            for idx, g in enumerate(ordered_groups):
-                if idx >= len(hours_cells):
-                    break
-                val = (hours_cells[idx] or "").strip()
-                if not val:
-                    continue
-                try:
-                    hours_int = int(val)
-                except ValueError:
-                    continue
-                if hours_int <= 0:
-                    continue
-                req_obj = Requirement.objects.filter(
-                    req_set=req_set,
-                    subject=current_subject,
-                    teacher=teacher,
-                    group=g,
-                ).first()
-                if req_obj:
-                    req_obj.hours = hours_int
-                    req_obj.save()
-                else:
-                    Requirement.objects.create(
-                        req_set=req_set,
-                        subject=current_subject,
-                        teacher=teacher,
-                        group=g,
-                        hours=hours_int,
-                    )
-                upserted += 1
-            processed_rows += 1
+            if label in teachers_cache and current_subject:
+                teacher = teachers_cache[label]
+
+                hours_cells = row[1:]
+
+                for idx, g in enumerate(ordered_groups):
+                    if idx >= len(hours_cells):
+                        break
+                    val = (hours_cells[idx] or "").strip()
+                    if not val:
+                        continue
+                    try:
+                        hours_int = int(val)
+                    except ValueError:
+                        continue
+                    if hours_int <= 0:
+                        continue
+                    hours_by_key[(current_subject.id, teacher.id, g.id)] = hours_int
+                    upserted += 1
+                    if len(hours_by_key) >= IMPORT_BATCH_SIZE:
+                        upsert_requirements(req_set, hours_by_key)
+                        hours_by_key = {}
+                processed_rows += 1
+
+        upsert_requirements(req_set, hours_by_key)
+    except (UnicodeDecodeError, InvalidFileException, BadZipFile):
+        transaction.set_rollback(True)
+        return Response({"error": "File is not a UTF-8 CSV or XLSX sheet"}, status=400)
 
     return Response(
         {
@@ -223,56 +345,90 @@ def import_requirements_csv(request):
 def run_evolutionary_process_endpoint(request):
     generations = request.data.get("generations")
     req_set_id = request.data.get("req_set_id")
-
-    if not isinstance(generations, int) or generations <= 1:
+    selection = request.data.get("selection", "softmax")
+    weights = request.data.get("weights", {})
+    local_search_time = request.data.get("local_search_time", 0)
+
+    if (
+        isinstance(generations, bool)
+        or not isinstance(generations, int)
+        or generations <= 1
+    ):
         return JsonResponse(
             {"error": "Invalid input. 'generations' must be a positive integer."},
             status=400,
         )
+    if not isinstance(selection, str) or selection not in SELECTION_METHODS:
+        return JsonResponse(
+            {
+                "error": f"Invalid input. 'selection' must be one of {list(SELECTION_METHODS)}."
+            },
+            status=400,
+        )
+    if not isinstance(weights, dict) or any(
+        name not in FITNESS_TERMS
+        or isinstance(weight, bool)
+        or not isinstance(weight, (int, float))
+        for name, weight in weights.items()
+    ):
+        return JsonResponse(
+            {
+                "error": f"Invalid input. 'weights' must map {list(FITNESS_TERMS)} to numbers."
+            },
+            status=400,
+        )
 
-    plan = run_evolutionary_process(generations, req_set_id)
-    plan_object = Plan.objects.create(
-        name=f"Plan generated using {RequirementSet.objects.get(id=req_set_id).name} on {datetime.now().strftime('%d/%m,%Y, %H:%M')}",
-        req_set=RequirementSet.objects.get(id=req_set_id),
-    )
+    if (
+        isinstance(local_search_time, bool)
+        or not isinstance(local_search_time, (int, float))
+        or local_search_time < 0
+    ):
+        return JsonResponse(
+            {
+                "error": "Invalid input. 'local_search_time' must be a non-negative number of seconds."
+            },
+            status=400,
+        )
 
-    room = Room.objects.first()
-    lessons = []
-
-    for block, start, end, day, room_ids in plan:
-        rooms = Room.objects.filter(id__in=room_ids)
-        rooms_for_teachers = {}
-        for req in block:
-            if not req.teacher in rooms_for_teachers:
-                room = list(
-                    filter(lambda r: req.subject in r.compatible_subjects.all(), rooms)
-                )[0]
-                if not room:
-                    print(block)
-                    print(room_ids)
-                    print(rooms)
-                    raise ValueError(
-                        f"No compatible room found for subject {req.subject.name}"
-                    )
-                rooms = rooms.exclude(id=room.id)
-                rooms_for_teachers[req.teacher] = room
-            else:
-                room = rooms_for_teachers[req.teacher]
-            for duration_offset in range(end - start):
-                lessons.append(
-                    Lesson(
-                        plan=plan_object,
-                        teacher=req.teacher,
-                        subject=req.subject,
-                        student_group=req.group,
-                        room=room,
-                        day=day,
-                        hour=start + duration_offset,
-                    )
+    try:
+        plan = run_in_solver_process(
+            run_evolutionary_process,
+            generations,
+            req_set_id,
+            selection,
+            weights,
+            local_search_time,
+        )
+    except BrokenProcessPool:
+        return JsonResponse(
+            {"error": "The solver process died, try again later."}, status=503
+        )
+    req_set = RequirementSet.objects.get(id=req_set_id)
+
+    # Rooms come assigned per teacher by the solver, so the plan is written
+    # without touching Room at all
+    with transaction.atomic():
+        plan_object = Plan.objects.create(
+            name=f"Plan generated using {req_set.name} on {datetime.now().strftime('%d/%m,%Y, %H:%M')}",
+            req_set=req_set,
+        )
+        Lesson.objects.bulk_create(
+            (
+                Lesson(
+                    plan=plan_object,
+                    teacher_id=req.teacher_id,
+                    subject_id=req.subject_id,
+                    student_group_id=req.group_id,
+                    room_id=room_by_teacher[req.teacher_id],
+                    day=day,
+                    hour=start + duration_offset,
                 )
-
-    plan_object.save()
-    Lesson.objects.bulk_create(lessons)
+                for block, start, end, day, room_by_teacher in plan
+                for req in block
+                for duration_offset in range(end - start)
+            ),
+            batch_size=1000,
+        )
 
     return JsonResponse(
         {"message": f"Evolutionary process completed for {generations} generations."},
@@ -591,80 +747,257 @@ class StudentGroupViewSet(ModelViewSet):
             return super().create(request, *args, **kwargs)
 
 
+# Same keys as RequirementSerializer, in values_list order
+REQUIREMENT_FIELDS = ("id", "req_set", "teacher", "group", "subject", "hours")
+
+
+def integer_field(value) -> int:
+    """``int(value)`` for ints, integral floats and numeric strings; bools and
+    fractions raise ValueError instead of being truncated."""
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    if not isinstance(value, (int, float, str)):
+        raise TypeError(value)
+    return int(value)
+
+
 class RequirementViewSet(ModelViewSet):
     queryset = Requirement.objects.all()
     serializer_class = RequirementSerializer
 
     @action(detail=False, methods=["get"])
     def grid(self, request):
+        """Teachers, groups, subjects and requirements of one requirement set.
+
+        ``?layout=compact`` returns parallel id/name arrays and an hours matrix
+        with one row per (subject, teacher) pair and one column per group.
+        Responses carry an ETag, so unchanged grids come back as 304.
+        """
         req_set_id = request.query_params.get("req_set_id")
-        if req_set_id:
-            try:
-                req_set = RequirementSet.objects.get(id=req_set_id)
-            except RequirementSet.DoesNotExist:
-                return Response({"error": "RequirementSet not found."}, status=404)
+        if not req_set_id:
+            return Response({"error": "req_set_id is required."}, status=400)
+        try:
+            req_set = RequirementSet.objects.get(id=req_set_id)
+        except (RequirementSet.DoesNotExist, ValueError):
+            return Response({"error": "RequirementSet not found."}, status=404)
 
-            teachers = Teacher.objects.filter(pool=req_set.teacher_pool)
-            groups = StudentGroup.objects.filter(pool=req_set.group_pool)
-            subjects = Subject.objects.filter(pool=req_set.subject_pool)
+        teachers = Teacher.objects.filter(
+            pool=req_set.teacher_pool_id
+        ).prefetch_related(
+            Prefetch("teached_subjects", queryset=Subject.objects.only("id", "name"))
+        )
+        groups = list(
+            StudentGroup.objects.filter(pool=req_set.group_pool_id).values_list(
+                "id", "name"
+            )
+        )
+        subjects = list(
+            Subject.objects.filter(pool=req_set.subject_pool_id).values_list(
+                "id", "name"
+            )
+        )
+        requirements = Requirement.objects.filter(req_set=req_set).values_list(
+            "id", "req_set_id", "teacher_id", "group_id", "subject_id", "hours"
+        )
 
-            requirements = Requirement.objects.filter(req_set=req_set)
-            requirements_data = RequirementSerializer(requirements, many=True).data
+        if request.query_params.get("layout") == "compact":
+            group_columns = {group_id: i for i, (group_id, _) in enumerate(groups)}
+            rows = {}
+            for _, _, teacher_id, group_id, subject_id, hours in requirements:
+                if group_id not in group_columns:
+                    continue
+                row = rows.setdefault((subject_id, teacher_id), [0] * len(groups))
+                row[group_columns[group_id]] = hours
 
+            data = {
+                "req_set": {"id": req_set.id, "name": req_set.name},
+                "teachers": {
+                    "id": [t.id for t in teachers],
+                    "name": [t.name for t in teachers],
+                    "subjects": [
+                        [s.id for s in t.teached_subjects.all()] for t in teachers
+                    ],
+                },
+                "groups": {
+                    "id": [group_id for group_id, _ in groups],
+                    "name": [name for _, name in groups],
+                },
+                "subjects": {
+                    "id": [subject_id for subject_id, _ in subjects],
+                    "name": [name for _, name in subjects],
+                },
+                "requirements": {
+                    "subject": [subject_id for subject_id, _ in rows],
+                    "teacher": [teacher_id for _, teacher_id in rows],
+                    "hours": list(rows.values()),
+                },
+            }
+        else:
             data = {
                 "req_set": {"id": req_set.id, "name": req_set.name},
                 "teachers": [
                     {
                         "id": t.id,
                         "name": t.name,
-                        "subjects": (
-                            [
-                                {"id": s.id, "name": s.name}
-                                for s in t.teached_subjects.all()
-                            ]
-                            if t.teached_subjects.exists()
-                            else []
-                        ),
+                        "subjects": [
+                            {"id": s.id, "name": s.name}
+                            for s in t.teached_subjects.all()
+                        ],
                     }
                     for t in teachers
                 ],
-                "groups": [{"id": g.id, "name": g.name} for g in groups],
-                "subjects": [{"id": s.id, "name": s.name} for s in subjects],
-                "requirements": requirements_data,
+                "groups": [{"id": i, "name": name} for i, name in groups],
+                "subjects": [{"id": i, "name": name} for i, name in subjects],
+                "requirements": [
+                    dict(zip(REQUIREMENT_FIELDS, values)) for values in requirements
+                ],
             }
-            return Response(data, status=200)
 
+        etag = quote_etag(
+            hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        )
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        return Response(
+            data, status=200, headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
+
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
-        print(request.data)
+        """Applies a list of changed grid cells as one diff.
+
+        Cells with ``hours == 0`` delete their requirement, the rest update or
+        insert one. All deletes, updates and inserts are sent as three
+        statements, and every cell gets its own entry in ``results``.
+        """
         data = request.data
+        if not isinstance(data, list):
+            return Response(
+                {"error": "Expect a list of requirements"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
+        keys = []
+        results = []
         for item in data:
-            req_set = item.get("req_set")
-            subject = item.get("subject")
-            teacher = item.get("teacher")
-            group = item.get("group")
-            hours = item.get("hours")
+            if not isinstance(item, dict):
+                results.append(
+                    {"status": "error", "error": "Each requirement must be an object"}
+                )
+                keys.append(None)
+                continue
+            result = {
+                field: item.get(field)
+                for field in ("req_set", "subject", "teacher", "group", "hours")
+            }
+            results.append(result)
+            try:
+                result.update(
+                    {field: integer_field(value) for field, value in result.items()}
+                )
+            except (TypeError, ValueError):
+                result["status"] = "error"
+                result["error"] = "All fields must be integers"
+            if "error" not in result and result["hours"] < 0:
+                result["status"] = "error"
+                result["error"] = "hours must not be negative"
+            keys.append(
+                (
+                    result["req_set"],
+                    result["subject"],
+                    result["teacher"],
+                    result["group"],
+                )
+            )
 
-            existing_requirement = Requirement.objects.filter(
-                req_set=req_set, subject=subject, teacher=teacher, group=group
-            ).first()
+        valid = [result for result in results if "error" not in result]
+        known_ids = {
+            field: set(
+                model.objects.filter(
+                    id__in={result[field] for result in valid}
+                ).values_list("id", flat=True)
+            )
+            for field, model in (
+                ("req_set", RequirementSet),
+                ("subject", Subject),
+                ("teacher", Teacher),
+                ("group", StudentGroup),
+            )
+        }
+        for result in valid:
+            missing = [
+                field for field, ids in known_ids.items() if result[field] not in ids
+            ]
+            if missing:
+                result["status"] = "error"
+                result["error"] = f"Unknown {', '.join(missing)}"
 
-            if existing_requirement:
-                if hours == 0:
+        if any("error" in result for result in results):
+            for result in results:
+                result.setdefault("status", "skipped")
+            return Response(
+                {"error": "Invalid requirements", "results": results},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-                    existing_requirement.delete()
-                else:
+        hours_by_key = dict(zip(keys, (result["hours"] for result in results)))
+        existing = {}
+        candidates = Requirement.objects.filter(
+            req_set_id__in={key[0] for key in hours_by_key},
+            subject_id__in={key[1] for key in hours_by_key},
+            teacher_id__in={key[2] for key in hours_by_key},
+            group_id__in={key[3] for key in hours_by_key},
+        )
+        for req in candidates:
+            existing[(req.req_set_id, req.subject_id, req.teacher_id, req.group_id)] = (
+                req
+            )
 
-                    existing_requirement.hours = hours
-                    existing_requirement.save()
+        to_delete, to_update, to_create = [], [], {}
+        key_status = {}
+        for key, hours in hours_by_key.items():
+            req_obj = existing.get(key)
+            if req_obj is None:
+                if hours == 0:
+                    key_status[key] = "unchanged"
+                else:
+                    req_set_id, subject_id, teacher_id, group_id = key
+                    to_create[key] = Requirement(
+                        req_set_id=req_set_id,
+                        subject_id=subject_id,
+                        teacher_id=teacher_id,
+                        group_id=group_id,
+                        hours=hours,
+                    )
+                    key_status[key] = "created"
+            elif hours == 0:
+                to_delete.append(req_obj.id)
+                key_status[key] = "deleted"
+            elif req_obj.hours != hours:
+                req_obj.hours = hours
+                to_update.append(req_obj)
+                key_status[key] = "updated"
             else:
-                if hours != 0:
-
-                    serializer = self.get_serializer(data=item)
-                    serializer.is_valid(raise_exception=True)
-                    self.perform_create(serializer)
+                key_status[key] = "unchanged"
+
+        Requirement.objects.filter(id__in=to_delete).delete()
+        Requirement.objects.bulk_update(to_update, ["hours"])
+        Requirement.objects.bulk_create(to_create.values())
+
+        for key, result in zip(keys, results):
+            result["status"] = key_status[key]
+            req_obj = to_create.get(key) or existing.get(key)
+            result["id"] = (
+                req_obj.id
+                if req_obj is not None and key_status[key] != "deleted"
+                else None
+            )
 
         return Response(
-            {"message": "Requirements processed successfully"},
+            {"message": "Requirements processed successfully", "results": results},
             status=status.HTTP_201_CREATED,
         )
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+# Django views here are synchronous, so threaded WSGI workers are the default.
+# GUNICORN_ASGI=1 serves inzynierka/asgi.py through uvicorn workers instead.
+if os.environ.get("GUNICORN_ASGI") == "1":
+    wsgi_app = "inzynierka.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "inzynierka.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+
+workers = int(
+    os.environ.get("GUNICORN_WORKERS", str(multiprocessing.cpu_count() * 2 + 1))
+)
+
+# A plan request waits for the solver process during the whole GA run
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "1800"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to return memory held by numpy/torch
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = "-"
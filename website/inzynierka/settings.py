@@ -23,12 +23,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-f%6yu$3h_^$g2p-_tezl4d2k5$5m!z-w+l3+y@2ks^up$=afj="
+SECRET_KEY = os.environ.get(
+    "DJANGO_SECRET_KEY",
+    "django-insecure-f%6yu$3h_^$g2p-_tezl4d2k5$5m!z-w+l3+y@2ks^up$=afj=",
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DJANGO_DEBUG", "True") == "True"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host
+]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -67,6 +72,7 @@ ROOT_URLCONF = "inzynierka.urls"
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -100,15 +106,29 @@ WSGI_APPLICATION = "inzynierka.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "inzynierka",
-        "USER": "inzynierka_user",
-        "PASSWORD": "koper123",
-        "HOST": "localhost",
-        "PORT": "",
+        "ENGINE": os.environ.get("DATABASE_ENGINE", "django.db.backends.postgresql"),
+        "NAME": os.environ.get("DATABASE_NAME", "inzynierka"),
+        "USER": os.environ.get("DATABASE_USER", "inzynierka_user"),
+        "PASSWORD": os.environ.get("DATABASE_PASSWORD", "koper123"),
+        "HOST": os.environ.get("DATABASE_HOST", "localhost"),
+        "PORT": os.environ.get("DATABASE_PORT", ""),
+        # Seconds a connection is kept between requests, 0 closes it after each
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# DATABASE_POOL=1 gives every worker process a psycopg 3 connection pool,
+# which replaces persistent connections
+if os.environ.get("DATABASE_POOL") == "1":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -150,10 +170,31 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = path.join(BASE_DIR, "staticfiles")
 
+# WhiteNoise serves the collected files with gzip/brotli variants, files with
+# a Vite content hash in their name are cached forever
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedStaticFilesStorage"},
+}
+WHITENOISE_IMMUTABLE_FILE_TEST = r"/assets/.+-[0-9A-Za-z_-]{8}\.\w+$"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Array backend for the evolutionary algorithm kernels ("numpy" or "torch").
+# The torch backend runs on CPU and uses GA_NUM_THREADS intra-op threads.
+GA_BACKEND = os.environ.get("GA_BACKEND", "numpy")
+GA_NUM_THREADS = int(os.environ.get("GA_NUM_THREADS", "0")) or None
+# "slots" samples all mutations at once on the array backend, "resample" runs
+# the per-block multinomial resampling (numba-compiled when numba is installed)
+GA_MUTATION = os.environ.get("GA_MUTATION", "slots")
+
+# Processes that run plan generation next to the serving workers, 0 runs it
+# inside the request thread. SOLVER_NICE lowers their CPU priority.
+SOLVER_PROCESSES = int(os.environ.get("SOLVER_PROCESSES", "0"))
+SOLVER_NICE = int(os.environ.get("SOLVER_NICE", "10"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True